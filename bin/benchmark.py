@@ -0,0 +1,344 @@
+"""
+Throughput benchmarks of the hot paths, with fixed seeds and small workloads.
+
+Run from the root of the repository: `python bin/benchmark.py [--scale 1.0] [--repeat 3] [--only equity ...]`
+Every benchmark reseeds the random generators and runs its workload repeat times. The best run is kept, as a rate per
+second, in a JSON file (benchmarks/<commit>.json by default) along with the commit, the versions and the settings.
+`python bin/benchmark.py --compare benchmarks/<old>.json` prints the rates of the new run next to those of an older one.
+
+  equity     estimates/s of pypokerengine's estimate_hole_card_win_rate and of the numpy engine (monte_carlo_win_rate)
+             at 1000 and 2000 simulations, and of estimate_win_rates as the players call it (tables, cold cache)
+  decisions  declare_action/s of every DQNPlayer version on decisions logged from seeded games (numpy backend)
+  emulator   actions/s of all the players through MyEmulator and LeanEmulator, with cheap opponents
+  replay     samples/s of a batch from the uniform and prioritized replay buffers
+  train      train_batch/s of Trainer (needs TensorFlow)
+  games      evaluation games/s against every opponent set of bin/main.py (numpy backend)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, 'src/')
+import numpy as np
+from pypokerengine.utils.card_utils import estimate_hole_card_win_rate, gen_cards
+
+from cards import card_ids, card_strs, remaining_deck
+from DQNPlayer import DQNPlayerV1, DQNPlayerV2, DQNPlayerV3And4, DQNPlayerV5, DQNPlayerV6
+from equity import estimate_win_rates, monte_carlo_win_rate
+from equity_cache import equity_cache
+from fish_player import FishPlayer
+from lean_engine import LeanEmulator
+from model_registry import ModelRegistry
+from my_emulator import MyEmulator
+from random_player import RandomPlayer
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
+from Trainer import Trainer, tf
+from main import fullCallSet, fullHonestSet, fullRandomSet, PolySet
+
+NB_PLAYERS = 5
+START_STACK = 1500
+MAX_ROUNDS = 15
+BATCH_SIZE = 128
+
+PLAYER_VERSIONS = [
+    ('V1', DQNPlayerV1, None),
+    ('V2', DQNPlayerV2, '2'),
+    ('V3And4', DQNPlayerV3And4, '4'),
+    ('V5', DQNPlayerV5, '5'),
+    ('V6', DQNPlayerV6, '6'),
+]
+
+OPPONENT_SETS = [
+    ('fullCallSet', fullCallSet),
+    ('fullRandomSet', fullRandomSet),
+    ('fullHonestSet', fullHonestSet),
+    ('PolySet', PolySet),
+]
+
+
+def seed_all(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def measure(run, seed, repeat):
+    """Best of repeat runs of run(), which returns the number of operations it did: (count, seconds)."""
+    best = None
+    for _ in range(repeat):
+        seed_all(seed)
+        start = time.perf_counter()
+        count = run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[1]:
+            best = (count, seconds)
+    return best
+
+
+def result(count, seconds, unit):
+    return {'rate': count / seconds, 'unit': unit, 'count': count, 'seconds': seconds}
+
+
+def random_spots(nb_spots, seed):
+    """(hole, board) string cards, spread evenly over the four streets."""
+    rng = np.random.RandomState(seed)
+    spots = []
+    for i in range(nb_spots):
+        deck = rng.permutation(remaining_deck([], []))
+        cards = card_strs(deck[:2 + [0, 3, 4, 5][i % 4]])
+        spots.append((cards[:2], cards[2:]))
+    return spots
+
+
+def bench_equity(args):
+    results = {}
+    spots = random_spots(args.workload(4), args.seed)
+    for nb_simulation in (1000, 2000):
+        def run():
+            for hole, board in spots:
+                estimate_hole_card_win_rate(nb_simulation, NB_PLAYERS, gen_cards(hole), gen_cards(board))
+            return len(spots)
+        results['equity/pypokerengine/{0}'.format(nb_simulation)] = result(*measure(run, args.seed, args.repeat),
+                                                                           'estimates/s')
+
+    spots = random_spots(args.workload(100), args.seed)
+    for nb_simulation in (1000, 2000):
+        def run():
+            for hole, board in spots:
+                monte_carlo_win_rate(nb_simulation, NB_PLAYERS, card_ids(hole), card_ids(board))
+            return len(spots)
+        results['equity/numpy/{0}'.format(nb_simulation)] = result(*measure(run, args.seed, args.repeat),
+                                                                   'estimates/s')
+
+    def run():
+        equity_cache.clear()
+        for hole, board in spots:
+            estimate_win_rates(2000, NB_PLAYERS, card_ids(hole), card_ids(board))
+        return len(spots)
+    results['equity/players'] = result(*measure(run, args.seed, args.repeat), 'estimates/s')
+    return results
+
+
+def _count_actions(player, counter):
+    declare_action = player.declare_action
+
+    def counted_declare_action(valid_actions, hole_card, round_state):
+        counter[0] += 1
+        return declare_action(valid_actions, hole_card, round_state)
+    player.declare_action = counted_declare_action
+    return player
+
+
+def play_emulated_games(emulator, nb_games, on_decision=None):
+    """
+    Plays nb_games games of seat 1 against cheap opponents on emulator, seat 1 always calling. on_decision is called
+    with every (valid_actions, hole_card, round_state) of seat 1. Returns the number of actions of all the players.
+    """
+    counter = [0]
+    emulator.set_game_rule(player_num=NB_PLAYERS, max_round=MAX_ROUNDS, small_blind_amount=5, ante_amount=0)
+    emulator.register_player('1', DQNPlayerV6(0, 0, NB_PLAYERS, START_STACK, MAX_ROUNDS, custom_uuid='1',
+                                              weights=[]))
+    for uuid, player in zip('2345', [FishPlayer(), RandomPlayer(), FishPlayer(), RandomPlayer()]):
+        emulator.register_player(uuid, _count_actions(player, counter))
+    for _ in range(nb_games):
+        game_state = emulator.generate_initial_game_state({uuid: {'name': uuid, 'stack': START_STACK}
+                                                           for uuid in '12345'})
+        game_state, _ = emulator.start_new_round(game_state)
+        messages = []
+        while True:
+            params = emulator.run_until_my_next_action(game_state, '1', messages)
+            if len(params) == 4:
+                game_state, valid_actions, hole_card, round_state = params
+                if on_decision:
+                    on_decision(valid_actions, hole_card, round_state)
+                counter[0] += 1
+                game_state, messages = emulator.apply_my_action(game_state, valid_actions[1]['action'],
+                                                                valid_actions[1]['amount'])
+            else:
+                game_state, _ = params
+                messages = []
+                if emulator._is_last_round(game_state, emulator.game_rule):
+                    break
+                game_state, _ = emulator.start_new_round(game_state)
+    return counter[0]
+
+
+def bench_emulator(args):
+    results = {}
+    for name, emulator_class in (('pypokerengine', MyEmulator), ('lean', LeanEmulator)):
+        def run():
+            return play_emulated_games(emulator_class(), args.workload(10))
+        results['emulator/' + name] = result(*measure(run, args.seed, args.repeat), 'actions/s')
+    return results
+
+
+def player_weights(player, version, registry):
+    model = registry.lookup(version) if version else None
+    if model is not None:
+        return ModelRegistry.load_weights(model)
+    nb_features = player.featurizer.nb_features
+    return [(np.random.randn(nb_features, player.h_size).astype(np.float32), np.zeros(player.h_size, np.float32)),
+            (np.random.randn(player.h_size, player.nb_outputs).astype(np.float32),
+             np.zeros(player.nb_outputs, np.float32))]
+
+
+def bench_decisions(args):
+    decisions = []
+    seed_all(args.seed)
+    while len(decisions) < args.workload(200):
+        play_emulated_games(LeanEmulator(), 1, on_decision=lambda *decision: decisions.append(decision))
+    decisions = decisions[:args.workload(200)]
+
+    results = {}
+    registry = ModelRegistry('./models')
+    for name, player_class, version in PLAYER_VERSIONS:
+        seed_all(args.seed)
+        player = player_class(0, 0, NB_PLAYERS, START_STACK, MAX_ROUNDS, custom_uuid='1', weights=[])
+        player.weights = player_weights(player, version, registry)
+
+        def run():
+            equity_cache.clear()
+            for valid_actions, hole_card, round_state in decisions:
+                player.declare_action(valid_actions, hole_card, round_state)
+            return len(decisions)
+        results['decisions/' + name] = result(*measure(run, args.seed, args.repeat), 'decisions/s')
+    return results
+
+
+def fill_replay_buffer(buffer, nb_inputs, nb_transitions):
+    buffer.extend(zip(np.random.rand(nb_transitions, nb_inputs).astype(np.float32),
+                      np.random.randint(0, 7, nb_transitions), np.random.randn(nb_transitions),
+                      np.random.rand(nb_transitions, nb_inputs).astype(np.float32),
+                      np.random.rand(nb_transitions) < 0.1))
+
+
+def bench_replay(args):
+    results = {}
+    nb_inputs = 12 + NB_PLAYERS - 1
+    for name, buffer_class in (('uniform', ReplayBuffer), ('prioritized', PrioritizedReplayBuffer)):
+        seed_all(args.seed)
+        buffer = buffer_class(nb_inputs)
+        fill_replay_buffer(buffer, nb_inputs, 50000)
+
+        def run():
+            for _ in range(args.workload(1000)):
+                buffer.sample(BATCH_SIZE)
+            return args.workload(1000)
+        results['replay/' + name] = result(*measure(run, args.seed, args.repeat), 'samples/s')
+    return results
+
+
+def bench_train(args):
+    if tf is None:
+        return {'train/step': {'skipped': 'tensorflow is not installed'}}
+    seed_all(args.seed)
+    tf.set_random_seed(args.seed)
+    trainer = Trainer(path='./logs', nb_players=NB_PLAYERS, max_rounds=MAX_ROUNDS, batch_size=BATCH_SIZE)
+    main_qn, target_qn, init, target_ops = trainer.build_training_graph()
+    buffer = trainer.make_replay_buffer(main_qn.nb_inputs)
+    fill_replay_buffer(buffer, main_qn.nb_inputs, 50000)
+    with tf.Session() as sess:
+        sess.run(init)
+        main_qn.set_session(sess)
+
+        def run():
+            for _ in range(args.workload(100)):
+                trainer.train_batch(sess, main_qn, target_qn, target_ops, buffer, trainer.start_beta)
+            return args.workload(100)
+        return {'train/step': result(*measure(run, args.seed, args.repeat), 'steps/s')}
+
+
+def bench_games(args):
+    results = {}
+    trainer = Trainer(path='./logs', nb_players=NB_PLAYERS, max_rounds=MAX_ROUNDS, inference_backend='numpy')
+    for name, players in OPPONENT_SETS:
+        def run():
+            equity_cache.clear()
+            for i in range(args.workload(2)):
+                trainer.start_real_game(players=players, ai_version=args.ai_version, seed=args.seed + i)
+            return args.workload(2)
+        results['games/' + name] = result(*measure(run, args.seed, args.repeat), 'games/s')
+    trainer.close_real_game_players()
+    return results
+
+
+BENCHMARKS = [
+    ('equity', bench_equity),
+    ('decisions', bench_decisions),
+    ('emulator', bench_emulator),
+    ('replay', bench_replay),
+    ('train', bench_train),
+    ('games', bench_games),
+]
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    for name, new_result in sorted(new['results'].items()):
+        old_result = old['results'].get(name, {})
+        if 'rate' not in new_result or 'rate' not in old_result:
+            continue
+        print('{0:32} {1:12.2f} -> {2:12.2f} {3:14} x{4:.2f}'.format(name, old_result['rate'], new_result['rate'],
+                                                                     new_result['unit'],
+                                                                     new_result['rate'] / old_result['rate']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput benchmarks of the hot paths.')
+    parser.add_argument('--only', nargs='+', choices=[name for name, _ in BENCHMARKS],
+                        help='benchmarks to run, all by default')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the size of every workload')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every workload, the best one is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ai-version', default='6', help='model playing the evaluation games')
+    parser.add_argument('--output', help='JSON file of the results, benchmarks/<commit>.json by default')
+    parser.add_argument('--compare', help='JSON file of an older run to compare with')
+    args = parser.parse_args()
+    args.workload = lambda size: max(1, int(round(size * args.scale)))
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'tensorflow': tf.__version__ if tf is not None else None,
+        'settings': {'scale': args.scale, 'repeat': args.repeat, 'seed': args.seed, 'ai_version': args.ai_version},
+        'results': {},
+    }
+    for name, benchmark in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        for key, value in benchmark(args).items():
+            report['results'][key] = value
+            if 'rate' in value:
+                print('{0:32} {1:12.2f} {2}'.format(key, value['rate'], value['unit']))
+            else:
+                print('{0:32} skipped: {1}'.format(key, value['skipped']))
+
+    output = args.output or os.path.join('benchmarks', '{0}.json'.format(commit[:12] if commit else 'latest'))
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('results written to', output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
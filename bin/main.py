@@ -2,6 +2,8 @@ import sys
 import configparser
 sys.path.insert(0, 'src/')
 from Trainer import Trainer
+from parallel_eval import make_pool, play_games
+from distributed_training import train as train_distributed
 
 from honest_player import HonestPlayer
 from fish_player import FishPlayer
@@ -46,7 +48,7 @@ PolySet = [
 ]
 
 
-def test_ai(trainer: Trainer, set, nb_games=10):
+def test_ai(trainer: Trainer, set, nb_games=10, pool=None, seed=0, nb_tables=1):
     nb_wins = {
         'p1': 0,
         'p2': 0,
@@ -54,37 +56,77 @@ def test_ai(trainer: Trainer, set, nb_games=10):
         'p4': 0,
         'p5': 0
     }
-    for i in range(0, nb_games):
-        game_result = trainer.start_real_game(players=set, ai_version=ai_version)
-        winner = game_result['players'][0]
-        for player in game_result['players']:
+    if pool is None and nb_tables > 1:
+        results = [game_result['players'] for game_result in
+                   trainer.play_real_games_batched(players=set, ai_version=ai_version, nb_games=nb_games,
+                                                   nb_tables=nb_tables)]
+    elif pool is None:
+        results = (trainer.start_real_game(players=set, ai_version=ai_version, seed=seed + i)['players']
+                   for i in range(0, nb_games))
+    else:
+        results = play_games(pool, set, nb_games, seed=seed, summary_writer=trainer.stats_writer(ai_version),
+                             step=trainer.nb_real_games)
+        trainer.nb_real_games += nb_games
+    for i, players in enumerate(results):
+        winner = players[0]
+        for player in players:
             if player['stack'] > winner['stack']:
                 winner = player
         print('winner for game number {0} is: {1}'.format(i, winner))
         nb_wins[winner['name']] += 1
     for key in nb_wins.keys():
         print(' ---- win rate of {0} is {1} ----'.format(key, nb_wins[key] / nb_games))
-
-
-try:
-    cfg = configparser.ConfigParser()
-    cfg.read('ai_config.cfg')
-
-    ai_version = str(cfg['DEFAULT']['ai_version'])
-    if ai_version not in ['3', '4', '5', '6']:
-        raise Exception('Error: only versions from 3 to 6 are supported for now')
-except Exception:
-    print('Error: Something happened, make sure the version inserted is supported and that you have an ai_config.cfg')
-    exit(0)
-
-trainer = Trainer(path='./logs', nb_players=5, max_rounds=15)
-
-# trainer.start()
-
-test_ai(trainer, fullCallSet, 100)
-test_ai(trainer, fullRandomSet, 100)
-test_ai(trainer, fullHonestSet, 100)
-test_ai(trainer, PolySet, 100)
-
-# If you want to play, uncomment the line below
-# test_ai(trainer, PolySetWithPlayer, 100)
+    trainer.save_equity_cache()
+
+
+if __name__ == '__main__':
+    try:
+        cfg = configparser.ConfigParser()
+        cfg.read('ai_config.cfg')
+
+        ai_version = str(cfg['DEFAULT']['ai_version'])
+        if ai_version not in ['3', '4', '5', '6']:
+            raise Exception('Error: only versions from 3 to 6 are supported for now')
+        equity_tolerance = cfg['DEFAULT'].getfloat('equity_tolerance', fallback=None)
+        range_equity = cfg['DEFAULT'].getboolean('range_equity', fallback=False)
+        nb_workers = cfg['DEFAULT'].getint('nb_workers', fallback=1)
+        inference_backend = cfg['DEFAULT'].get('inference_backend', fallback='tensorflow')
+        model_selection = cfg['DEFAULT'].get('model', fallback='best')
+        nb_tables = cfg['DEFAULT'].getint('nb_tables', fallback=1)
+        prioritized_replay = cfg['DEFAULT'].getboolean('prioritized_replay', fallback=False)
+        replay_path = cfg['DEFAULT'].get('replay_path', fallback=None)
+        nb_actors = cfg['DEFAULT'].getint('nb_actors', fallback=1)
+        game_engine = cfg['DEFAULT'].get('game_engine', fallback='pypokerengine')
+        log_level = cfg['DEFAULT'].get('log_level', fallback='info')
+        log_path = cfg['DEFAULT'].get('log_path', fallback=None)
+        log_sample_rates = {name: float(rate) for name, rate in
+                            (item.split(':') for item in cfg['DEFAULT'].get('log_sample_rates', fallback='').split())}
+        hand_history_path = cfg['DEFAULT'].get('hand_history_path', fallback=None)
+    except Exception:
+        print('Error: Something happened, make sure the version inserted is supported and that you have an ai_config.cfg')
+        exit(0)
+
+    trainer_kwargs = dict(path='./logs', nb_players=5, max_rounds=15, equity_cache_path='./logs/equity_cache.pkl',
+                          equity_tolerance=equity_tolerance, range_equity=range_equity,
+                          inference_backend=inference_backend, model_selection=model_selection,
+                          prioritized_replay=prioritized_replay, replay_path=replay_path,
+                          game_engine=game_engine, log_path=log_path, log_level=log_level,
+                          log_sample_rates=log_sample_rates, hand_history_path=hand_history_path)
+    trainer = Trainer(**trainer_kwargs)
+    pool = make_pool(trainer_kwargs, ai_version, nb_workers, trainer.events) if nb_workers > 1 else None
+
+    # trainer.start() if nb_actors <= 1 else train_distributed(trainer, trainer_kwargs, nb_actors)
+    # or, with 16 training games stepped in lockstep: trainer.start_vectorized(nb_envs=16)
+
+    test_ai(trainer, fullCallSet, 100, pool=pool, seed=0, nb_tables=nb_tables)
+    test_ai(trainer, fullRandomSet, 100, pool=pool, seed=100, nb_tables=nb_tables)
+    test_ai(trainer, fullHonestSet, 100, pool=pool, seed=200, nb_tables=nb_tables)
+    test_ai(trainer, PolySet, 100, pool=pool, seed=300, nb_tables=nb_tables)
+
+    # If you want to play, uncomment the line below
+    # test_ai(trainer, PolySetWithPlayer, 100)
+
+    trainer.close_real_game_players()
+    if pool is not None:
+        pool.close()
+        pool.join()
@@ -1,28 +1,33 @@
 from pypokerengine.players import BasePokerPlayer
-from pypokerengine.utils.card_utils import gen_cards, estimate_hole_card_win_rate
-import tensorflow as tf
+try:
+    import tensorflow as tf
+except ImportError:  # players built with weights (numpy_backend.py) do not need it
+    tf = None
+
+from cards import card_ids
+from equity import estimate_win_rates
+from features import Featurizer, decision_values
+from numpy_backend import predict
+from phase_timers import phase_timers
+from range_equity import aggression_weights, range_win_rate
 
 
 class DQNPlayer(BasePokerPlayer):
 
     h_size = 32
+    features = ()
+    nb_simulation = 1000
 
     def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, version, nb_inputs, nb_outputs,
-                 custom_uuid=None, load=False):
+                 custom_uuid=None, load=False, equity_tolerance=None, range_equity=False, weights=None):
         super().__init__()
 
         self.nb_players = nb_players
         self.start_stack = start_stack
-        self.stack_begin_of_round = start_stack
         self.max_round = max_round
-        self.agressivity = 0
-        self.latest_ehs = 0
-        self.overall_agressivity = 0
-        self.nb_actions_history = 0
-        self.seat_position = 0
+        self.featurizer = Featurizer(self.features, nb_players, start_stack, max_round)
+        self.reset_game_state()
 
-        self.call_amount = 10
-        self.pot_odds = 10
         self.load = load
         if custom_uuid:
             self.uuid = custom_uuid
@@ -31,18 +36,84 @@ class DQNPlayer(BasePokerPlayer):
 
         self.nb_inputs = nb_inputs
         self.nb_outputs = nb_outputs
+        self.equity_tolerance = equity_tolerance
+        self.range_equity = range_equity
+
+        self.inputs = None
+        self.weights = weights
+        self.batcher = None
+        self.hand_recorder = None
+        if weights is not None:
+            self.summary_writer = None
+            return
 
         self.summary_writer = tf.summary.FileWriter('./stats/v' + str(version))
         if load:
             self.session = tf.Session()
-        self.inputs = None
+        self.build_network()
 
     def set_session(self, session):
         self.session = session
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
+    def build_network(self):
         raise NotImplementedError()
 
+    def set_batcher(self, batcher):
+        self.batcher = batcher
+
+    def set_hand_recorder(self, hand_recorder):
+        """Records the hands of the games played through the messages of pypokerengine, None to stop."""
+        self.hand_recorder = hand_recorder
+
+    def predict_batch(self, inputs):
+        with phase_timers.time('inference'):
+            if self.weights is not None:
+                return predict(self.weights, inputs)
+            return self.session.run(self.predict, feed_dict={self.input_layer: inputs})
+
+    def predict_action(self, inputs):
+        if self.batcher is not None:
+            return self.batcher.predict(inputs)
+        return self.predict_batch([inputs])[0]
+
+    def reset_game_state(self):
+        self.stack_begin_of_round = self.start_stack
+        self.agressivity = 0
+        self.latest_ehs = 0
+        self.overall_agressivity = 0
+        self.nb_actions_history = 0
+        self.seat_position = 0
+
+        self.call_amount = 10
+        self.pot_odds = 10
+
+        self.hand = None
+        self.hand_game = None
+        self.hand_stacks = None
+
+    def gather_informations(self, hole_card, round_state, valid_actions=None, out=None):
+        values = decision_values(round_state, valid_actions, self.uuid)
+        nb_player = self.equity_players(values)
+        with phase_timers.time('equity'):
+            hand_strength = self.estimate_hand_win_rate(hole_card, round_state, nb_simulation=self.nb_simulation,
+                                                        nb_player=nb_player) / nb_player
+        self.pot_odds = values.pots / values.call_amount
+        self.latest_ehs = hand_strength
+        return self.featurizer.fill_values(values, hand_strength, self.overall_agressivity, self.seat_position, out)
+
+    def equity_players(self, values):
+        """Number of players the hand strength is estimated against, from the decision_values of the decision."""
+        return self.nb_players
+
+    def estimate_hand_win_rate(self, hole_card, round_state, nb_simulation, nb_player):
+        hole = card_ids(hole_card)
+        board = card_ids(round_state['community_card'])
+        if self.range_equity:
+            return range_win_rate(hole, board, aggression_weights(self.overall_agressivity), nb_opponents=nb_player - 1)
+        win_rates = estimate_win_rates(nb_simulation=nb_simulation, nb_player=self.nb_players, hole=hole, board=board,
+                                       tolerance=self.equity_tolerance)
+        return win_rates[nb_player - 2]
+
     @staticmethod
     def select_action(valid_actions, action_idx):
         raise NotImplementedError()
@@ -50,15 +121,17 @@ class DQNPlayer(BasePokerPlayer):
     def declare_action(self, valid_actions, hole_card, round_state):
         self.inputs = self.gather_informations(hole_card, round_state, valid_actions)
 
-        action = self.session.run(self.predict, feed_dict={self.input_layer: [self.inputs]})[0]
-        _, action, amount = self.select_action(valid_actions, action_idx=action)
+        action = self.predict_action(self.inputs)
+        action_idx, action, amount = self.select_action(valid_actions, action_idx=action)
+        if self.hand is not None:
+            self.hand.add_decision(self.inputs, action_idx)
 
         return action, amount
 
     def declare_action_emul(self, valid_actions, hole_card, round_state):
         self.inputs = self.gather_informations(hole_card, round_state, valid_actions)
 
-        action_idx = self.session.run(self.predict, feed_dict={self.input_layer: [self.inputs]})[0]
+        action_idx = self.predict_action(self.inputs)
         _, action, amount = self.select_action(valid_actions, action_idx=action_idx)
 
         return action_idx, action, amount
@@ -70,6 +143,9 @@ class DQNPlayer(BasePokerPlayer):
 
     def receive_game_start_message(self, game_info):
         self.agressivity = 0
+        if self.hand_recorder is not None:
+            self.hand_game = self.hand_recorder.new_game()
+            self.hand_stacks = [seat['stack'] for seat in game_info['seats']]
 
     def receive_round_start_message(self, round_count, hole_card, seats):
         seat_pos = 0
@@ -79,6 +155,11 @@ class DQNPlayer(BasePokerPlayer):
                 break
             seat_pos += 1
         self.seat_position = seat_pos
+        if self.hand_recorder is not None and self.hand_stacks is not None:
+            # the cards of the opponents are unknown
+            hole_cards = [hole_card if pos == seat_pos else None for pos in range(len(seats))]
+            self.hand = self.hand_recorder.begin_hand(self.hand_game, self.hand_stacks, hole_cards,
+                                                      self.featurizer.nb_features, seat_pos)
 
     def receive_street_start_message(self, street, round_state):
         street_map = {'preflop': 0, 'flop': 1, 'turn': 2, 'river': 3}
@@ -89,7 +170,10 @@ class DQNPlayer(BasePokerPlayer):
         pass
 
     def receive_round_result_message(self, winners, hand_info, round_state):
-        pass
+        if self.hand is not None:
+            self.hand_recorder.end_hand(self.hand, round_state)
+            self.hand = None
+            self.hand_stacks = [seat['stack'] for seat in round_state['seats']]
 
     def is_winner(self, game_result):
         winner = game_result['table'].seats.players[0]
@@ -99,7 +183,9 @@ class DQNPlayer(BasePokerPlayer):
         return winner.uuid == self.uuid
 
     def update_inputs(self, game_result):
-        raise NotImplementedError()
+        table = game_result['table']
+        return self.featurizer.fill_terminal(table.seats.players, self.uuid, table.dealer_btn, self.latest_ehs,
+                                             self.overall_agressivity)
 
     def update_agressivity(self, round_state, old_street):
         street_map = {0: 'preflop', 1: 'flop', 2: 'turn', 3: 'river'}
@@ -126,13 +212,27 @@ class DQNPlayer(BasePokerPlayer):
 
 class DQNPlayerV6(DQNPlayer):
     h_size = 32
+    features = ('dealer_btn', 'hand_strength', 'call_amount', 'pots', 'agressivity', 'round_ratio', 'street',
+                'player_stack', 'other_participating_stacks', 'participating_players')
+    nb_simulation = 2000
 
-    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False):
+    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False,
+                 equity_tolerance=None, range_equity=False, weights=None):
         super().__init__(learning_rate, discount, nb_players, start_stack, max_round, version=6,
-                         nb_inputs=12+(nb_players-1), nb_outputs=7, custom_uuid=custom_uuid, load=load)
+                         nb_inputs=12+(nb_players-1), nb_outputs=7, custom_uuid=custom_uuid, load=load,
+                         equity_tolerance=equity_tolerance, range_equity=range_equity, weights=weights)
 
         self.nb_participating_players = self.nb_players
 
+    def equity_players(self, values):
+        participating_players = values.nb_participating
+
+        if participating_players == 1:
+            participating_players += 1
+        self.nb_participating_players = participating_players
+        return participating_players
+
+    def build_network(self):
         self.input_layer = tf.placeholder(dtype=tf.float32, shape=[None, self.nb_inputs])
 
         h1 = tf.layers.dense(self.input_layer, self.h_size, activation=tf.nn.relu,
@@ -146,37 +246,13 @@ class DQNPlayerV6(DQNPlayer):
         self.actions_onehot = tf.one_hot(self.actions, self.nb_outputs, dtype=tf.float32)
         self.QOut = tf.reduce_sum(tf.multiply(self.output_layer, self.actions_onehot), axis=1)
         self.error = tf.square(self.target_output - self.QOut)
+        # importance-sampling weights of prioritized replay, 1 when sampling uniformly
+        self.is_weights = tf.placeholder_with_default(tf.ones_like(self.target_output), shape=[None])
 
-        self.loss = tf.reduce_mean(self.error)
+        self.loss = tf.reduce_mean(self.is_weights * self.error)
         self.optimizer = tf.train.AdamOptimizer(learning_rate=self.learning_rate)
         self.update = self.optimizer.minimize(self.loss)
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
-        participating_players = \
-            len([player for player in round_state['seats'] if player['state'] == 'participating'])
-
-        if participating_players == 1:
-            participating_players += 1
-        self.nb_participating_players = participating_players
-        hand_strength = estimate_hole_card_win_rate(nb_simulation=2000, nb_player=participating_players,
-                                                    hole_card=gen_cards(hole_card),
-                                                    community_card=gen_cards(round_state['community_card'])) / participating_players
-        street = {'preflop': 0, 'flop': 0, 'turn': 0, 'river': 0, round_state['street']: 1}
-
-        pots = sum([round_state['pot']['main']['amount']] + [pot['amount'] for pot in round_state['pot']['side']])
-        dealer_btn = self.seat_position - round_state['dealer_btn']
-        player_stack = [player['stack'] for player in round_state['seats'] if player['uuid'] == self.uuid][0] / self.start_stack
-        other_stacks = [player['stack'] / self.start_stack if player['state'] == 'participating' else 0
-                        for player in round_state['seats'] if player['uuid'] != self.uuid]
-
-        call_amount_in_live = valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
-        self.pot_odds = pots / call_amount_in_live
-        self.latest_ehs = hand_strength
-        round_ratio = round_state['round_count'] / self.max_round
-
-        return [dealer_btn, hand_strength, call_amount_in_live, pots, self.overall_agressivity, round_ratio,
-                *list(street.values()), player_stack, *other_stacks, participating_players]
-
     @staticmethod
     def select_action(valid_actions, action_idx):
         gap = (valid_actions[2]['amount']['max'] - valid_actions[2]['amount']['min']) / 4
@@ -199,22 +275,20 @@ class DQNPlayerV6(DQNPlayer):
 
         return action_idx, action[0], action[1]
 
-    def update_inputs(self, game_result):
-        table = game_result['table']
-        player_stack = [player.stack for player in table.seats.players if player.uuid == self.uuid][0] / self.start_stack
-        other_stacks = [player.stack / self.start_stack for player in table.seats.players if player.uuid != self.uuid]
-        return [table.dealer_btn, self.latest_ehs, 0, 0, self.overall_agressivity, 1,
-                0, 0, 0, 0, player_stack, *other_stacks, 5]
-
 
 class DQNPlayerV5(DQNPlayer):
 
     h_size = 32
+    features = ('hand_strength', 'call_amount', 'pots', 'agressivity', 'round_ratio', 'street', 'player_stack',
+                'other_stacks')
 
-    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False):
+    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False,
+                 equity_tolerance=None, range_equity=False, weights=None):
         super().__init__(learning_rate, discount, nb_players, start_stack, max_round, version=5, nb_inputs=10+(nb_players-1),
-                         nb_outputs=7, custom_uuid=custom_uuid, load=load)
+                         nb_outputs=7, custom_uuid=custom_uuid, load=load, equity_tolerance=equity_tolerance,
+                         range_equity=range_equity, weights=weights)
 
+    def build_network(self):
         self.input_layer = tf.placeholder(dtype=tf.float32, shape=[None, self.nb_inputs])
 
         h1 = tf.layers.dense(self.input_layer, self.h_size, activation=tf.nn.relu,
@@ -233,22 +307,6 @@ class DQNPlayerV5(DQNPlayer):
         self.optimizer = tf.train.AdamOptimizer(learning_rate=self.learning_rate)
         self.update = self.optimizer.minimize(self.loss)
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
-        hand_strength = estimate_hole_card_win_rate(nb_simulation=1000, nb_player=self.nb_players, hole_card=gen_cards(hole_card),
-                                                    community_card=gen_cards(round_state['community_card'])) / self.nb_players
-        street = {'preflop': 0, 'flop': 0, 'turn': 0, 'river': 0, round_state['street']: 1}
-
-        pots = sum([round_state['pot']['main']['amount']] + [pot['amount'] for pot in round_state['pot']['side']])
-        player_stack = [player['stack'] for player in round_state['seats'] if player['uuid'] == self.uuid][0] / self.start_stack
-        other_stacks = [player['stack'] / self.start_stack for player in round_state['seats'] if player['uuid'] != self.uuid]
-
-        call_amount_in_live = valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
-        self.pot_odds = pots / call_amount_in_live
-        self.latest_ehs = hand_strength
-        round_ratio = round_state['round_count'] / self.max_round
-
-        return [hand_strength, call_amount_in_live, pots, self.overall_agressivity, round_ratio, *list(street.values()), player_stack, *other_stacks]
-
     @staticmethod
     def select_action(valid_actions, action_idx):
         gap = (valid_actions[2]['amount']['max'] - valid_actions[2]['amount']['min']) / 4
@@ -271,21 +329,19 @@ class DQNPlayerV5(DQNPlayer):
 
         return action_idx, action[0], action[1]
 
-    def update_inputs(self, game_result):
-        table = game_result['table']
-        player_stack = [player.stack for player in table.seats.players if player.uuid == self.uuid][0] / self.start_stack
-        other_stacks = [player.stack / self.start_stack for player in table.seats.players if player.uuid != self.uuid]
-        return [self.latest_ehs, 0, 0, self.overall_agressivity, 1, 0, 0, 0, 0, player_stack, *other_stacks]
-
 
 class DQNPlayerV3And4(DQNPlayer):
 
     h_size = 32
+    features = ('hand_strength', 'pots', 'agressivity', 'round_ratio', 'street', 'player_stack', 'other_stacks')
 
-    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False):
+    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False,
+                 equity_tolerance=None, range_equity=False, weights=None):
         super().__init__(learning_rate, discount, nb_players, start_stack, max_round, version=5, nb_inputs=9+(nb_players-1),
-                         nb_outputs=5, custom_uuid=custom_uuid, load=load)
+                         nb_outputs=5, custom_uuid=custom_uuid, load=load, equity_tolerance=equity_tolerance,
+                         range_equity=range_equity, weights=weights)
 
+    def build_network(self):
         self.input_layer = tf.placeholder(dtype=tf.float32, shape=[None, self.nb_inputs])
 
         h1 = tf.layers.dense(self.input_layer, self.h_size, activation=tf.nn.relu,
@@ -304,22 +360,6 @@ class DQNPlayerV3And4(DQNPlayer):
         self.optimizer = tf.train.AdamOptimizer(learning_rate=self.learning_rate)
         self.update = self.optimizer.minimize(self.loss)
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
-        hand_strength = estimate_hole_card_win_rate(nb_simulation=1000, nb_player=self.nb_players, hole_card=gen_cards(hole_card),
-                                                    community_card=gen_cards(round_state['community_card'])) / self.nb_players
-        street = {'preflop': 0, 'flop': 0, 'turn': 0, 'river': 0, round_state['street']: 1}
-
-        pots = sum([round_state['pot']['main']['amount']] + [pot['amount'] for pot in round_state['pot']['side']])
-        player_stack = [player['stack'] for player in round_state['seats'] if player['uuid'] == self.uuid][0] / self.start_stack
-        other_stacks = [player['stack'] / self.start_stack for player in round_state['seats'] if player['uuid'] != self.uuid]
-
-        call_amount_in_live = valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
-        self.pot_odds = pots / call_amount_in_live
-        self.latest_ehs = hand_strength
-        round_ratio = round_state['round_count'] / self.max_round
-
-        return [hand_strength, pots, self.overall_agressivity, round_ratio, *list(street.values()), player_stack, *other_stacks]
-
     @staticmethod
     def select_action(valid_actions, action_idx):
         actions = {
@@ -339,21 +379,19 @@ class DQNPlayerV3And4(DQNPlayer):
 
         return action_idx, action[0], action[1]
 
-    def update_inputs(self, game_result):
-        table = game_result['table']
-        player_stack = [player.stack for player in table.seats.players if player.uuid == self.uuid][0] / self.start_stack
-        other_stacks = [player.stack / self.start_stack for player in table.seats.players if player.uuid != self.uuid]
-        return [self.latest_ehs, 0, self.overall_agressivity, 1, 0, 0, 0, 0, player_stack, *other_stacks]
-
 
 class DQNPlayerV2(DQNPlayer):
 
     h_size = 32
+    features = ('hand_strength', 'pots', 'street', 'player_stack', 'other_stacks')
 
-    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False):
+    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False,
+                 equity_tolerance=None, range_equity=False, weights=None):
         super().__init__(learning_rate, discount, nb_players, start_stack, max_round, version=5, nb_inputs=9+(nb_players-1),
-                         nb_outputs=5, custom_uuid=custom_uuid, load=load)
+                         nb_outputs=5, custom_uuid=custom_uuid, load=load, equity_tolerance=equity_tolerance,
+                         range_equity=range_equity, weights=weights)
 
+    def build_network(self):
         self.input_layer = tf.placeholder(dtype=tf.float32, shape=[None, self.nb_inputs])
 
         h1 = tf.layers.dense(self.input_layer, self.h_size, activation=tf.nn.relu,
@@ -376,21 +414,6 @@ class DQNPlayerV2(DQNPlayer):
         self.optimizer = tf.train.AdamOptimizer(learning_rate=self.learning_rate)
         self.update = self.optimizer.minimize(self.loss)
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
-        hand_strength = estimate_hole_card_win_rate(nb_simulation=1000, nb_player=self.nb_players, hole_card=gen_cards(hole_card),
-                                                    community_card=gen_cards(round_state['community_card'])) / self.nb_players
-        street = {'preflop': 0, 'flop': 0, 'turn': 0, 'river': 0, round_state['street']: 1}
-
-        pots = sum([round_state['pot']['main']['amount']] + [pot['amount'] for pot in round_state['pot']['side']])
-        player_stack = [player['stack'] for player in round_state['seats'] if player['uuid'] == self.uuid][0] / self.start_stack
-        other_stacks = [player['stack'] / self.start_stack for player in round_state['seats'] if player['uuid'] != self.uuid]
-
-        call_amount_in_live = valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
-        self.pot_odds = pots / call_amount_in_live
-        self.latest_ehs = hand_strength
-
-        return [hand_strength, pots, *list(street.values()), player_stack, *other_stacks]
-
     @staticmethod
     def select_action(valid_actions, action_idx):
         actions = {
@@ -410,21 +433,19 @@ class DQNPlayerV2(DQNPlayer):
 
         return action_idx, action[0], action[1]
 
-    def update_inputs(self, game_result):
-        table = game_result['table']
-        player_stack = [player.stack for player in table.seats.players if player.uuid == self.uuid][0] / self.start_stack
-        other_stacks = [player.stack / self.start_stack for player in table.seats.players if player.uuid != self.uuid]
-        return [self.latest_ehs, 0, 0, 0, 0, 0, player_stack, *other_stacks]
-
 
 class DQNPlayerV1(DQNPlayer):
 
     h_size = 32
+    features = ('hand_strength', 'pots', 'street', 'player_stack', 'other_stacks')
 
-    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False):
+    def __init__(self, learning_rate, discount, nb_players, start_stack, max_round, custom_uuid=None, load=False,
+                 equity_tolerance=None, range_equity=False, weights=None):
         super().__init__(learning_rate, discount, nb_players, start_stack, max_round, version=5, nb_inputs=9+(nb_players-1),
-                         nb_outputs=4, custom_uuid=custom_uuid, load=load)
+                         nb_outputs=4, custom_uuid=custom_uuid, load=load, equity_tolerance=equity_tolerance,
+                         range_equity=range_equity, weights=weights)
 
+    def build_network(self):
         self.input_layer = tf.placeholder(dtype=tf.float32, shape=[None, self.nb_inputs])
 
         h1 = tf.layers.dense(self.input_layer, self.h_size, activation=tf.nn.relu,
@@ -443,21 +464,6 @@ class DQNPlayerV1(DQNPlayer):
         self.optimizer = tf.train.AdamOptimizer(learning_rate=self.learning_rate)
         self.update = self.optimizer.minimize(self.loss)
 
-    def gather_informations(self, hole_card, round_state, valid_actions=None):
-        hand_strength = estimate_hole_card_win_rate(nb_simulation=1000, nb_player=self.nb_players, hole_card=gen_cards(hole_card),
-                                                    community_card=gen_cards(round_state['community_card'])) / self.nb_players
-        street = {'preflop': 0, 'flop': 0, 'turn': 0, 'river': 0, round_state['street']: 1}
-
-        pots = sum([round_state['pot']['main']['amount']] + [pot['amount'] for pot in round_state['pot']['side']])
-        player_stack = [player['stack'] for player in round_state['seats'] if player['uuid'] == self.uuid][0] / self.start_stack
-        other_stacks = [player['stack'] / self.start_stack for player in round_state['seats'] if player['uuid'] != self.uuid]
-
-        call_amount_in_live = valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
-        self.pot_odds = pots / call_amount_in_live
-        self.latest_ehs = hand_strength
-
-        return [hand_strength, pots, *list(street.values()), player_stack, *other_stacks]
-
     @staticmethod
     def select_action(valid_actions, action_idx):
         actions = {
@@ -475,10 +481,3 @@ class DQNPlayerV1(DQNPlayer):
             action = actions[1]
 
         return action_idx, action[0], action[1]
-
-    def update_inputs(self, game_result):
-        table = game_result['table']
-        player_stack = [player.stack for player in table.seats.players if player.uuid == self.uuid][0] / self.start_stack
-        other_stacks = [player.stack / self.start_stack for player in table.seats.players if player.uuid != self.uuid]
-        return [self.latest_ehs, 0, 0, 0, 0, 0, player_stack, *other_stacks]
-
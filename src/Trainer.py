@@ -10,9 +10,13 @@ poker game but there are many aspects that are different in my code and I show m
 reward part.
 """
 
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
 
-import tensorflow as tf
+try:
+    import tensorflow as tf
+except ImportError:  # evaluation games can still be played with inference_backend='numpy'
+    tf = None
 import numpy as np
 import random as rand
 from pypokerengine.api.game import setup_config, start_poker
@@ -23,20 +27,23 @@ from honest_player import HonestPlayer
 from fish_player import FishPlayer
 from console_player import ConsolePlayer
 from my_emulator import MyEmulator
+from lean_engine import LeanEmulator
+from equity_cache import equity_cache
+from event_log import EventLog
+from hand_history import HandRecorder
+from model_registry import ModelRegistry
+from phase_timers import phase_timers
+from batched_inference import InferenceBatcher
+from replay_buffer import MemmapReplayBuffer, PrioritizedReplayBuffer, ReplayBuffer
+from vec_env import VecEnv
 
 
-class experience_buffer:
-    def __init__(self, buffer_size=50000):
-        self.buffer = []
-        self.buffer_size = buffer_size
-
-    def add(self, experience):
-        if len(self.buffer) + len(experience) >= self.buffer_size:
-            self.buffer[0:(len(experience) + len(self.buffer)) - self.buffer_size] = []
-        self.buffer.extend(experience)
-
-    def sample(self, size):
-        return np.reshape(np.array(rand.sample(self.buffer, size)), [size, 5])
+AI_CLASSES = {
+    '3': DQNPlayerV3And4,
+    '4': DQNPlayerV3And4,
+    '5': DQNPlayerV5,
+    '6': DQNPlayerV6,
+}
 
 
 class Trainer:
@@ -54,7 +61,11 @@ class Trainer:
         for op in op_holder:
             sess.run(op)
 
-    def __init__(self, batch_size=128, update_freq=50, discount=0.99, path=None, nb_players=5, max_rounds=10, start_stack=1500, load=False):
+    def __init__(self, batch_size=128, update_freq=50, discount=0.99, path=None, nb_players=5, max_rounds=10, start_stack=1500, load=False,
+                 equity_cache_path=None, equity_tolerance=None, range_equity=False, inference_backend='tensorflow',
+                 models_path='./models', model_selection='best', keep_checkpoints=5, prioritized_replay=False,
+                 replay_path=None, replay_capacity=10000000, game_engine='pypokerengine', log_path=None, log_level='info',
+                 log_sample_rates=None, hand_history_path=None, log_queue=None):
         self.batch_size = batch_size
         self.update_freq = update_freq
         # self.learning_rate = 0.001
@@ -67,7 +78,18 @@ class Trainer:
         self.pre_train_steps = 1500 # how many steps of random action before training begin
         self.path = path
         self.tau = 0.01 # rate to update target network toward primary network
+        self.prioritized_replay = prioritized_replay
+        self.start_beta = 0.4 # importance-sampling correction of prioritized replay, annealed to 1
+        # directory of a disk-backed replay store kept across runs, uniform sampling only
+        self.replay_path = replay_path
+        self.replay_capacity = replay_capacity
         self.latest_reward = 0
+        self.nb_real_games = 0
+        # JSON lines of the training events, on stdout without log_path, e.g. log_sample_rates={'action': 0.01}.
+        # The Trainers of worker processes send them to the log of the parent through its log_queue.
+        self.events = EventLog(log_path, log_level, log_sample_rates, queue=log_queue)
+        # chunks of the hands of the training and evaluation games (hand_history.py), not recorded without a path
+        self.hand_recorder = HandRecorder(hand_history_path) if hand_history_path else None
 
         self.nb_players = nb_players
         self.max_rounds = max_rounds
@@ -75,134 +97,330 @@ class Trainer:
 
         self.saver = None
         self.load = load
-        self.emulator = MyEmulator()
-
-    def start(self, file=None):
+        self.real_game_players = {}
+        self.stats_writers = {}
+        self.inference_backend = inference_backend
+        self.model_registry = ModelRegistry(models_path)
+        self.model_selection = model_selection
+        self.keep_checkpoints = keep_checkpoints
+        # 'lean' plays the training games on lean_engine.py instead of pypokerengine, with the same rules
+        self.game_engine = game_engine
+        self.emulator = self.new_emulator()
+
+        self.equity_tolerance = equity_tolerance
+        self.range_equity = range_equity
+        self.equity_cache_path = equity_cache_path
+        if equity_cache_path:
+            equity_cache.load(equity_cache_path)
+
+    def save_equity_cache(self):
+        if self.equity_cache_path:
+            equity_cache.save(self.equity_cache_path)
+        self.events.info('equity_cache', entries=len(equity_cache), hit_rate=equity_cache.hit_rate())
+
+    def new_emulator(self):
+        emulator = LeanEmulator() if self.game_engine == 'lean' else MyEmulator()
+        emulator.record_rounds = self.hand_recorder is not None
+        return emulator
+
+    def new_training_player(self, weights=None):
+        return DQNPlayerV6(learning_rate=self.learning_rate, discount=self.y, nb_players=self.nb_players,
+                           start_stack=self.start_stack, max_round=self.max_rounds, custom_uuid="1",
+                           equity_tolerance=self.equity_tolerance, range_equity=self.range_equity, weights=weights)
+
+    def build_training_graph(self):
         tf.reset_default_graph()
-        main_qn = DQNPlayerV6(learning_rate=self.learning_rate, discount=self.y, nb_players=self.nb_players,
-                            start_stack=self.start_stack, max_round=self.max_rounds, custom_uuid="1")
+        main_qn = self.new_training_player()
         target_qn = DQNPlayerV6(learning_rate=self.learning_rate, discount=self.y, nb_players=self.nb_players,
                               start_stack=self.start_stack, max_round=self.max_rounds)
 
         init = tf.global_variables_initializer()
-        self.saver = tf.train.Saver()
+        # old checkpoints are pruned by the registry, which also keeps the best one
+        self.saver = tf.train.Saver(max_to_keep=None)
         trainables = tf.trainable_variables()
         target_ops = self.updateTargetGraph(trainables, self.tau)
-        buffer = experience_buffer()
+        return main_qn, target_qn, init, target_ops
+
+    def restore_training_model(self, sess, file=None):
+        self.events.info('restore_model', file=file)
+        if not file:
+            ckpt = tf.train.get_checkpoint_state(self.path)
+            self.saver.restore(sess, ckpt.model_checkpoint_path)
+        else:
+            self.saver.restore(sess, self.path + file)
+
+    def register_training_players(self, main_qn, emulator=None):
+        emulator = emulator or self.emulator
+        emulator.set_game_rule(player_num=self.nb_players, max_round=self.max_rounds, small_blind_amount=5, ante_amount=0)
+        emulator.register_player(uuid="1", player=main_qn)
+        emulator.register_player(uuid="2", player=FishPlayer())
+        emulator.register_player(uuid="3", player=FishPlayer())
+        emulator.register_player(uuid="4", player=HonestPlayer(nb_players=self.nb_players,
+                                                                 equity_tolerance=self.equity_tolerance))
+        emulator.register_player(uuid="5", player=RandomPlayer())
+
+    def new_training_game(self, emulator=None):
+        """Initial game state of the registered training players."""
+        emulator = emulator or self.emulator
+        return emulator.generate_initial_game_state({
+            "1": {"name": "DQNPlayer", "stack": self.start_stack},
+            "2": {"name": "FishPlayer1", "stack": self.start_stack},
+            "3": {"name": "FishPlayer2", "stack": self.start_stack},
+            "4": {"name": "HonestPlayer", "stack": self.start_stack},
+            "5": {"name": "RandomPlayer", "stack": self.start_stack},
+        })
+
+    def play_training_episode(self, main_qn, explore, after_action=None):
+        """
+        Plays one game of the registered training players and returns its transitions and total reward. explore is
+        called before every action of main_qn and returns True to replace it by a random action, after_action is
+        called once the action is applied.
+        """
+        episode_buffer = []
+        game = self.hand_recorder.new_game() if self.hand_recorder is not None else None
+        stacks = [self.start_stack] * self.nb_players
+        with phase_timers.time('emulator'):
+            game_state, events = self.emulator.start_new_round(self.new_training_game())
+        hand = self.begin_training_hand(game, stacks, game_state, main_qn)
+        main_qn.set_begin_round_stack(game_state['table'].seats.players)
+        main_qn.receive_round_start_message(None, None, game_state['table'].seats.players)
+        rAll = 0
+        msgs = []
+
+        prev_inputs = None
+        prev_action = None
+        last_round = False
+        j = 0
+        nb_rounds = 0
+
+        while not last_round:
+            with phase_timers.time('emulator'):
+                params = self.emulator.run_until_my_next_action(game_state, "1", msgs)
+
+            if len(params) == 4:
+                game_state, valid_actions, hole_card, round_state = params
+                action_idx, action, amount = main_qn.declare_action_emul(valid_actions, hole_card, round_state)
+
+                if explore():
+                    action_idx, action, amount = main_qn.select_action(valid_actions, np.random.randint(0, main_qn.nb_outputs))
+                if hand is not None:
+                    hand.add_decision(main_qn.inputs, action_idx)
+
+                with phase_timers.time('emulator'):
+                    game_state, msgs = self.emulator.apply_my_action(game_state, action, amount)
+
+                #  I have to wait to have the next state which I won't know before the next hand before saving
+                #  my experience
+                if prev_inputs is not None:
+                    episode_buffer.append((prev_inputs, prev_action, 0, main_qn.inputs, False))
+
+                prev_inputs = main_qn.inputs
+                prev_action = action_idx
+                if after_action:
+                    after_action()
+            else:
+                j += 1
+                game_state, reward = params
+                raw_reward = reward
+                last_round = self.emulator._is_last_round(game_state, self.emulator.game_rule)
+                nb_rounds, reward = self.set_reward_v6(reward, game_state, main_qn, nb_rounds, j, last_round)
+                self.events.debug('round', round=j, raw_reward=raw_reward, reward=reward)
+                rAll += reward
+                if reward != 0 and prev_inputs is not None:
+                    episode_buffer.append((prev_inputs, prev_action, reward, main_qn.inputs, True))
+                if last_round:
+                    prev_inputs = None
+                    prev_action = None
+                if hand is not None:
+                    self.hand_recorder.end_hand(hand, self.emulator.last_round_state)
+                    stacks = [player.stack for player in game_state['table'].seats.players]
+                with phase_timers.time('emulator'):
+                    game_state, events = self.emulator.start_new_round(game_state)
+                if not last_round:
+                    hand = self.begin_training_hand(game, stacks, game_state, main_qn)
+                main_qn.set_begin_round_stack(game_state['table'].seats.players)
+                main_qn.receive_round_start_message(None, None, game_state['table'].seats.players)
+        return episode_buffer, rAll
+
+    def begin_training_hand(self, game, stacks, game_state, main_qn):
+        """
+        Recorded hand of main_qn in the round started in game_state, the stacks of the seats before its blinds being
+        stacks.
+        """
+        if self.hand_recorder is None:
+            return None
+        players = game_state['table'].seats.players
+        return self.hand_recorder.begin_hand(game, stacks, [player.hole_card for player in players],
+                                             main_qn.featurizer.nb_features,
+                                             agent_seat=[player.uuid for player in players].index('1'))
+
+    def train_batch(self, sess, main_qn, target_qn, target_ops, buffer, beta):
+        """One double DQN update of main_qn on a batch of buffer, then a soft update of target_qn."""
+        with phase_timers.time('replay_sample'):
+            if isinstance(buffer, PrioritizedReplayBuffer):
+                states, actions, rewards, next_states, dones, indices, weights = buffer.sample(self.batch_size, beta)
+            else:
+                states, actions, rewards, next_states, dones = buffer.sample(self.batch_size)
+                weights = np.ones(self.batch_size, dtype=np.float32)
+        with phase_timers.time('train_step'):
+            Q1 = sess.run(main_qn.predict, feed_dict={main_qn.input_layer: next_states})
+            Q2 = sess.run(target_qn.output_layer, feed_dict={target_qn.input_layer: next_states})
+            end_multiplier = 1 - dones
+            double_q = Q2[range(self.batch_size), Q1]
+            target_q = rewards + (self.y * double_q * end_multiplier)
+            _, loss, q_out = sess.run([main_qn.update, main_qn.loss, main_qn.QOut],
+                                      feed_dict={
+                                          main_qn.input_layer: states,
+                                          main_qn.target_output: target_q,
+                                          main_qn.actions: actions,
+                                          main_qn.is_weights: weights
+                                      })
+        if isinstance(buffer, PrioritizedReplayBuffer):
+            buffer.update_priorities(indices, target_q - q_out)
+        with phase_timers.time('target_update'):
+            self.updateTarget(target_ops, sess)
+        return loss
+
+    def start(self, file=None):
+        main_qn, target_qn, init, target_ops = self.build_training_graph()
+        training_registry = ModelRegistry(self.path)
+        first_step = training_registry.next_step('6')
+        episode_rewards = []
+        buffer = self.make_replay_buffer(main_qn.nb_inputs)
+        beta = self.start_beta
+        betaStep = (1 - self.start_beta) / self.annealings_steps
 
         e = self.start_E
         stepDrop = (self.start_E - self.end_E) / self.annealings_steps
-
-        action_list = []
         total_steps = 0
 
-        self.emulator.set_game_rule(player_num=self.nb_players, max_round=self.max_rounds, small_blind_amount=5, ante_amount=0)
-        self.emulator.register_player(uuid="1", player=main_qn)
-        self.emulator.register_player(uuid="2", player=FishPlayer())
-        self.emulator.register_player(uuid="3", player=FishPlayer())
-        self.emulator.register_player(uuid="4", player=HonestPlayer(nb_players=self.nb_players))
-        self.emulator.register_player(uuid="5", player=RandomPlayer())
+        self.register_training_players(main_qn)
 
         with tf.Session() as sess:
             sess.run(init)
             main_qn.set_session(sess)
             if self.load:
-                print('restoring model')
-                if not file:
-                    ckpt = tf.train.get_checkpoint_state(self.path)
-                    self.saver.restore(sess, ckpt.model_checkpoint_path)
-                else:
-                    self.saver.restore(sess, self.path + file)
+                self.restore_training_model(sess, file)
+
+            def explore():
+                return np.random.rand(1) < e or total_steps < self.pre_train_steps
+
+            def after_action():
+                nonlocal total_steps, e, beta
+                total_steps += 1
+                self.events.debug('action', total_steps=total_steps)
+                if total_steps > self.pre_train_steps:
+                    if e > self.end_E:
+                        e -= stepDrop
+                    if total_steps % self.update_freq == 0:
+                        self.train_batch(sess, main_qn, target_qn, target_ops, buffer, beta)
+                        beta = min(1.0, beta + betaStep)
 
             for i in range(0, self.num_episodes):
-                episode_buffer = experience_buffer()
-                init_state = self.emulator.generate_initial_game_state({
-                    "1": {"name": "DQNPlayer", "stack": self.start_stack},
-                    "2": {"name": "FishPlayer1", "stack": self.start_stack},
-                    "3": {"name": "FishPlayer2", "stack": self.start_stack},
-                    "4": {"name": "HonestPlayer", "stack": self.start_stack},
-                    "5": {"name": "RandomPlayer", "stack": self.start_stack},
-                })
-                game_state, events = self.emulator.start_new_round(init_state)
-                main_qn.set_begin_round_stack(game_state['table'].seats.players)
-                main_qn.receive_round_start_message(None, None, game_state['table'].seats.players)
-                rAll = 0
-                msgs = []
-
-                prev_inputs = None
-                prev_action = None
-                last_round = False
-                j = 0
-                nb_rounds = 0
-
-                while not last_round:
-                    params = self.emulator.run_until_my_next_action(game_state, "1", msgs)
-
-                    if len(params) == 4:
-                        game_state, valid_actions, hole_card, round_state = params
-                        action_idx, action, amount = main_qn.declare_action_emul(valid_actions, hole_card, round_state)
-
-                        if np.random.rand(1) < e or total_steps < self.pre_train_steps:
-                            action_idx, action, amount = main_qn.select_action(valid_actions, np.random.randint(0, main_qn.nb_outputs))
-
-                        game_state, msgs = self.emulator.apply_my_action(game_state, action, amount)
-                        total_steps += 1
-                        print('total number of actions:', total_steps)
-
-                        #  I have to wait to have the next state which I won't know before the next hand before saving
-                        #  my experience
-                        if prev_inputs:
-                            episode_buffer.add(np.reshape(
-                                np.array([prev_inputs, prev_action, 0, main_qn.inputs, False]), [1, 5])
-                            )
-
-                        prev_inputs = main_qn.inputs
-                        prev_action = action_idx
-                        action_list.append(action_idx)
-                        if total_steps > self.pre_train_steps:
-                            if e > self.end_E:
-                                e -= stepDrop
-                            if total_steps % self.update_freq == 0:
-                                train_batch = buffer.sample(self.batch_size)
-                                Q1 = sess.run(main_qn.predict,
-                                              feed_dict={main_qn.input_layer: np.vstack(train_batch[:, 3])})
-                                Q2 = sess.run(target_qn.output_layer,
-                                              feed_dict={target_qn.input_layer: np.vstack(train_batch[:, 3])})
-                                end_multiplier = -(train_batch[:, 4] - 1)
-                                double_q = Q2[range(self.batch_size), Q1]
-                                target_q = train_batch[:, 2] + (self.y * double_q * end_multiplier)
-                                _, loss = sess.run([main_qn.update, main_qn.loss],
-                                                   feed_dict={
-                                                       main_qn.input_layer: np.vstack(train_batch[:, 0]),
-                                                       main_qn.target_output: target_q,
-                                                       main_qn.actions: train_batch[:, 1]
-                                                   })
-                                self.updateTarget(target_ops, sess)
-                    else:
-                        j += 1
-                        game_state, reward = params
-                        print('reward before process:', reward)
-                        last_round = self.emulator._is_last_round(game_state, self.emulator.game_rule)
-                        nb_rounds, reward = self.set_reward_v6(reward, game_state, main_qn, nb_rounds, j, last_round)
-                        print('reward for round after process:', reward)
-                        rAll += reward
-                        if reward != 0:
-                            episode_buffer.add(np.reshape(
-                                np.array([prev_inputs, prev_action, reward, main_qn.inputs, True]), [1, 5])
-                            )
-                        if last_round:
-                            prev_inputs = None
-                            prev_action = None
-                        game_state, events = self.emulator.start_new_round(game_state)
-                        main_qn.set_begin_round_stack(game_state['table'].seats.players)
-                        main_qn.receive_round_start_message(None, None, game_state['table'].seats.players)
-
-                buffer.add(episode_buffer.buffer)
-                print(" -------- finished episode number: ---------------- ", i)
+                episode_buffer, rAll = self.play_training_episode(main_qn, explore, after_action)
+                buffer.extend(episode_buffer)
+                phase_timers.count('transitions', len(episode_buffer))
+                episode_rewards.append(rAll)
+                self.events.info('episode', episode=i, reward=rAll, transitions=len(episode_buffer),
+                                 total_steps=total_steps)
                 if i % 200 == 0:
-                    self.saver.save(sess, self.path+'/model_v6-'+str(i)+'.ckpt')
-                    print("Saved Model")
-            self.saver.save(sess, self.path+'/model_v6-'+str(i)+'.ckpt')
+                    self.save_checkpoint(sess, training_registry, first_step + i, episode_rewards)
+                    if isinstance(buffer, MemmapReplayBuffer):
+                        buffer.flush()
+                    episode_rewards = []
+                    self.events.info('checkpoint', episode=i)
+                    self.save_equity_cache()
+                phase_timers.write_summary(main_qn.summary_writer, i)
+            self.save_checkpoint(sess, training_registry, first_step + i, episode_rewards)
+            if isinstance(buffer, MemmapReplayBuffer):
+                buffer.flush()
+            self.save_equity_cache()
+            if self.hand_recorder is not None:
+                self.hand_recorder.flush()
+
+    def start_vectorized(self, nb_envs=16, file=None):
+        """
+        Trains like start, with nb_envs games stepped in lockstep by a VecEnv: the actions of all the games are
+        chosen by one forward pass, and the chance of random action is drawn per game.
+        """
+        main_qn, target_qn, init, target_ops = self.build_training_graph()
+        training_registry = ModelRegistry(self.path)
+        first_step = training_registry.next_step('6')
+        episode_rewards = []
+        buffer = self.make_replay_buffer(main_qn.nb_inputs)
+        beta = self.start_beta
+        betaStep = (1 - self.start_beta) / self.annealings_steps
+
+        e = self.start_E
+        stepDrop = (self.start_E - self.end_E) / self.annealings_steps
+        total_steps = 0
+        nb_games = 0
+
+        env = VecEnv(self, main_qn, nb_envs)
+
+        with tf.Session() as sess:
+            sess.run(init)
+            main_qn.set_session(sess)
+            if self.load:
+                self.restore_training_model(sess, file)
+
+            observations = env.reset()
+            while nb_games < self.num_episodes:
+                actions = main_qn.predict_batch(observations)
+                if total_steps < self.pre_train_steps:
+                    explore = np.ones(nb_envs, dtype=bool)
+                else:
+                    explore = np.random.rand(nb_envs) < e
+                actions = np.where(explore, np.random.randint(0, main_qn.nb_outputs, nb_envs), actions)
+
+                next_observations, rewards, dones, game_rewards = env.step(actions)
+                buffer.extend(zip(observations, actions, rewards, next_observations, dones))
+                phase_timers.count('transitions', nb_envs)
+                observations = next_observations
+
+                for _ in range(nb_envs):
+                    total_steps += 1
+                    if total_steps > self.pre_train_steps:
+                        if e > self.end_E:
+                            e -= stepDrop
+                        if total_steps % self.update_freq == 0:
+                            self.train_batch(sess, main_qn, target_qn, target_ops, buffer, beta)
+                            beta = min(1.0, beta + betaStep)
+                self.events.debug('action', total_steps=total_steps)
+
+                for rAll in game_rewards:
+                    episode_rewards.append(rAll)
+                    self.events.info('episode', episode=nb_games, reward=rAll, total_steps=total_steps)
+                    if nb_games % 200 == 0:
+                        self.save_checkpoint(sess, training_registry, first_step + nb_games, episode_rewards)
+                        if isinstance(buffer, MemmapReplayBuffer):
+                            buffer.flush()
+                        episode_rewards = []
+                        self.events.info('checkpoint', episode=nb_games)
+                        self.save_equity_cache()
+                    phase_timers.write_summary(main_qn.summary_writer, nb_games)
+                    nb_games += 1
+            self.save_checkpoint(sess, training_registry, first_step + nb_games - 1, episode_rewards)
+            if isinstance(buffer, MemmapReplayBuffer):
+                buffer.flush()
+            self.save_equity_cache()
+
+    def make_replay_buffer(self, nb_inputs):
+        if self.replay_path and self.prioritized_replay:
+            raise ValueError('prioritized_replay is not supported with replay_path, whose store samples uniformly')
+        if self.replay_path:
+            return MemmapReplayBuffer(self.replay_path, nb_inputs, capacity=self.replay_capacity)
+        if self.prioritized_replay:
+            return PrioritizedReplayBuffer(nb_inputs)
+        return ReplayBuffer(nb_inputs)
+
+    def save_checkpoint(self, sess, registry, step, episode_rewards):
+        """Saves and registers the model at step, counted from the registry's next_step when the run started."""
+        with phase_timers.time('checkpoint'):
+            path = self.saver.save(sess, self.path+'/model_v6-'+str(step)+'.ckpt')
+            score = float(np.mean(episode_rewards)) if episode_rewards else None
+            registry.register('6', step, path, score=score)
+            registry.prune('6', keep_latest=self.keep_checkpoints)
 
     def set_reward_v6(self, reward, game_state, main_qn, nb_rounds, j, last_round):
         if reward != 0:
@@ -265,39 +483,109 @@ class Trainer:
         reward = reward / (self.start_stack * self.nb_players)
         return nb_rounds, reward
 
-    def start_real_game(self, players, ai_version='5'):
-        ai_params = {
-            '3': {
-                'class': DQNPlayerV3And4,
-                'model': '3200'
-            },
-            '4': {
-                'class': DQNPlayerV3And4,
-                'model': '9999'
-            },
-            '5': {
-                'class': DQNPlayerV5,
-                'model': '19999'
-            },
-        }
-        path = './models/v' + ai_version + '/model_v' + ai_version + '-' + ai_params[ai_version]['model'] + '.ckpt'
-        tf.reset_default_graph()
-        main_qn = ai_params[ai_version]['class'](learning_rate=self.learning_rate, discount=self.y,
-                                                 nb_players=self.nb_players, start_stack=self.start_stack,
-                                                 max_round=self.max_rounds)
-
-        init = tf.global_variables_initializer()
-        self.saver = tf.train.Saver()
-
-        with tf.Session() as sess:
-            sess.run(init)
-            main_qn.set_session(sess)
-            self.saver.restore(sess, path)
-            config = setup_config(max_round=self.max_rounds, initial_stack=self.start_stack, small_blind_amount=5)
-            i = 1
-            for player in players:
-                config.register_player(name='p'+str(i), algorithm=player['class'](**player['kwargs']))
-                i += 1
-            config.register_player(name='p' + str(i), algorithm=main_qn)
-            game_result = start_poker(config, verbose=0)
-            return game_result
+    @staticmethod
+    def seed_game(seed):
+        rand.seed(seed)
+        np.random.seed(seed)
+
+    def load_real_game_player(self, ai_version='5'):
+        model = self.model_registry.lookup(ai_version, self.model_selection)
+        if model is None:
+            raise ValueError('no model of version {0} for model={1} in {2}'.format(ai_version, self.model_selection,
+                                                                               self.model_registry.path))
+        ai_class = AI_CLASSES[ai_version]
+        if self.inference_backend == 'numpy':
+            return ai_class(learning_rate=self.learning_rate, discount=self.y, nb_players=self.nb_players,
+                            start_stack=self.start_stack, max_round=self.max_rounds,
+                            equity_tolerance=self.equity_tolerance, range_equity=self.range_equity,
+                            weights=ModelRegistry.load_weights(model))
+
+        graph = tf.Graph()
+        with graph.as_default():
+            main_qn = ai_class(learning_rate=self.learning_rate, discount=self.y, nb_players=self.nb_players,
+                               start_stack=self.start_stack, max_round=self.max_rounds,
+                               equity_tolerance=self.equity_tolerance, range_equity=self.range_equity)
+            init = tf.global_variables_initializer()
+            saver = tf.train.Saver()
+
+        sess = tf.Session(graph=graph)
+        sess.run(init)
+        main_qn.set_session(sess)
+        saver.restore(sess, model['checkpoint'])
+        return main_qn
+
+    def get_real_game_player(self, ai_version='5'):
+        """Model of ai_version, built in its own graph (or read from its .npy) and restored on the first call only."""
+        if ai_version not in self.real_game_players:
+            self.real_game_players[ai_version] = self.load_real_game_player(ai_version)
+        return self.real_game_players[ai_version]
+
+    def stats_writer(self, ai_version='5'):
+        """
+        TensorBoard writer of the real games of ai_version played by other processes: that of its model when it is
+        loaded here, None with the numpy backend, whose models write no stats.
+        """
+        if ai_version in self.real_game_players:
+            return self.real_game_players[ai_version].summary_writer
+        if self.inference_backend == 'numpy':
+            return None
+        if ai_version not in self.stats_writers:
+            self.stats_writers[ai_version] = tf.summary.FileWriter('./stats/v' + str(ai_version))
+        return self.stats_writers[ai_version]
+
+    def close_real_game_players(self):
+        for main_qn in self.real_game_players.values():
+            if main_qn.weights is None:
+                main_qn.session.close()
+        self.real_game_players = {}
+        for writer in self.stats_writers.values():
+            writer.close()
+        self.stats_writers = {}
+        if self.hand_recorder is not None:
+            self.hand_recorder.flush()
+
+    def play_real_game(self, main_qn, players, seed=None):
+        if seed is not None:
+            self.seed_game(seed)
+        main_qn.reset_game_state()
+        main_qn.set_hand_recorder(self.hand_recorder)
+        config = setup_config(max_round=self.max_rounds, initial_stack=self.start_stack, small_blind_amount=5)
+        i = 1
+        for player in players:
+            config.register_player(name='p'+str(i), algorithm=player['class'](**player['kwargs']))
+            i += 1
+        config.register_player(name='p' + str(i), algorithm=main_qn)
+        with phase_timers.time('game'):
+            return start_poker(config, verbose=0)
+
+    def play_real_games_batched(self, players, ai_version='5', nb_games=10, nb_tables=8, **batcher_kwargs):
+        """
+        Plays nb_games games on nb_tables tables running in threads. The seats of the model at every table share
+        one InferenceBatcher, so their decisions are run as batched forward passes. The tables share the global
+        random generators, so the games are not reproducible from a seed.
+        """
+        main_qn = self.get_real_game_player(ai_version)
+        batcher = InferenceBatcher(main_qn.predict_batch, **batcher_kwargs)
+
+        def play(_):
+            table_qn = copy(main_qn)
+            table_qn.set_batcher(batcher)
+            return self.play_real_game(table_qn, players)
+
+        try:
+            with ThreadPoolExecutor(nb_tables) as executor:
+                return list(executor.map(play, range(nb_games)))
+        finally:
+            batcher.close()
+            self.events.info('batched_inference', decisions=batcher.nb_requests,
+                             mean_batch_size=batcher.mean_batch_size())
+            phase_timers.write_summary(main_qn.summary_writer, self.nb_real_games)
+            self.nb_real_games += nb_games
+
+    def start_real_game(self, players, ai_version='5', seed=None):
+        main_qn = self.get_real_game_player(ai_version)
+        try:
+            return self.play_real_game(main_qn, players, seed=seed)
+        finally:
+            phase_timers.write_summary(main_qn.summary_writer, self.nb_real_games)
+            self.nb_real_games += 1
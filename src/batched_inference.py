@@ -0,0 +1,79 @@
+"""
+Micro-batched DQN inference shared by many concurrent games.
+
+Every DQN seat of every table running in its own thread submits its inputs to one InferenceBatcher and waits for
+its action. A background thread gathers the pending requests and runs them as a single forward pass as soon as
+max_batch_size requests are queued or max_latency seconds have passed since the oldest one, then hands every
+result back to its caller. A DQNPlayer routes declare_action through a batcher set with set_batcher.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+
+import numpy as np
+
+MAX_BATCH_SIZE = 64
+MAX_LATENCY = 0.002
+
+
+class InferenceBatcher:
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_latency=MAX_LATENCY):
+        """predict_batch maps a (batch, nb_inputs) array to the action index of every row."""
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.requests = Queue()
+        self.nb_batches = 0
+        self.nb_requests = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, inputs):
+        future = Future()
+        self.requests.put((inputs, future))
+        return future
+
+    def predict(self, inputs):
+        return self.submit(inputs).result()
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+
+    def mean_batch_size(self):
+        return self.nb_requests / self.nb_batches if self.nb_batches else 0.0
+
+    def _next_batch(self):
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except Empty:
+            return []
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=timeout))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.running or not self.requests.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                actions = self.predict_batch(np.array([inputs for inputs, _ in batch], dtype=np.float32))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), action in zip(batch, actions):
+                future.set_result(action)
+            self.nb_batches += 1
+            self.nb_requests += len(batch)
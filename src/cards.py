@@ -0,0 +1,54 @@
+"""
+Compact card encoding shared by the equity computations and the hand evaluator.
+
+A card is an integer id = rank * 4 + suit, with ranks from 0 (deuce) to 12 (ace) and suits in the order of SUITS.
+A set of cards can also be stored as a 52-bit mask where bit `id` is set for every card of the set.
+pypokerengine's string cards ('SA', 'H9', ...) are converted with a single dict lookup per card.
+"""
+
+import numpy as np
+
+SUITS = 'CDHS'
+RANKS = '23456789TJQKA'
+NB_CARDS = 52
+
+CARD_IDS = {suit + rank: r * 4 + s for r, rank in enumerate(RANKS) for s, suit in enumerate(SUITS)}
+CARD_STRS = {card_id: card_str for card_str, card_id in CARD_IDS.items()}
+
+
+def card_id(card):
+    return CARD_IDS[card]
+
+
+def card_ids(cards):
+    return np.array([CARD_IDS[card] for card in cards], dtype=np.int64)
+
+
+def card_strs(ids):
+    return [CARD_STRS[int(card_id)] for card_id in ids]
+
+
+def card_rank(card_id):
+    return card_id >> 2
+
+
+def card_suit(card_id):
+    return card_id & 3
+
+
+def card_mask(ids):
+    mask = 0
+    for card_id in ids:
+        mask |= 1 << int(card_id)
+    return mask
+
+
+def mask_ids(mask):
+    return np.array([card_id for card_id in range(NB_CARDS) if mask >> card_id & 1], dtype=np.int64)
+
+
+def remaining_deck(*used):
+    in_use = np.zeros(NB_CARDS, dtype=bool)
+    for ids in used:
+        in_use[ids] = True
+    return np.flatnonzero(~in_use)
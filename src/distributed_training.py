@@ -0,0 +1,175 @@
+"""
+Actor/learner training of DQNPlayerV6 over local processes.
+
+Every actor process builds its own Trainer and plays the training games of Trainer.start with a TensorFlow-free copy
+of the policy (numpy_backend.py weights), then sends the transitions of every game to the learner through a
+multiprocessing queue. The learner owns the replay buffer and the training graph: it trains on the buffer at the
+replay ratio of Trainer.start, one update every update_freq actions played by the actors, and waits for games
+otherwise. Every weights_refresh updates, it sends the new weights of the main network, with the current chance of
+random action, to every actor. Experience collection scales with the number of actors while the learner trains. The
+learner stops with a RuntimeError when every actor has died. Actors are started with the spawn method, so that no
+TensorFlow state is inherited from the learner, and their events go to the log of the learner. The phase timers of
+every game of an actor are sent with its transitions and added to those of the learner.
+"""
+
+from multiprocessing import get_context
+from queue import Empty
+
+import numpy as np
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+from Trainer import Trainer
+from model_registry import ModelRegistry
+from numpy_backend import main_network_layers
+from phase_timers import phase_timers
+from replay_buffer import MemmapReplayBuffer
+
+WEIGHTS_REFRESH = 50
+QUEUE_TIMEOUT = 10.0
+
+
+def _run_actor(trainer_kwargs, policy_queue, transitions_queue, stop_event):
+    trainer = Trainer(**trainer_kwargs)
+    weights, e = policy_queue.get()
+    main_qn = trainer.new_training_player(weights=weights)
+    trainer.register_training_players(main_qn)
+    nb_actions = 0
+
+    def explore():
+        return np.random.rand(1) < e
+
+    def after_action():
+        nonlocal nb_actions
+        nb_actions += 1
+
+    while not stop_event.is_set():
+        try:
+            while True:
+                weights, e = policy_queue.get_nowait()
+                main_qn.weights = weights
+        except Empty:
+            pass
+        nb_actions = 0
+        episode_buffer, reward = trainer.play_training_episode(main_qn, explore, after_action)
+        transitions_queue.put((episode_buffer, reward, nb_actions, phase_timers.collect()))
+
+
+def _receive(transitions_queue, actors, block):
+    """
+    Next game sent by the actors, None when none is waiting and block is False. Raises a RuntimeError when the learner
+    is waiting and every actor has stopped.
+    """
+    while True:
+        try:
+            return transitions_queue.get(block=block, timeout=QUEUE_TIMEOUT)
+        except Empty:
+            if not block:
+                return None
+            if not any(actor.is_alive() for actor in actors):
+                raise RuntimeError('every actor process has stopped')
+
+
+def main_network_weights(sess):
+    """(kernel, bias) of every layer of the main network, in the format of numpy_backend.load_weights."""
+    variables = tf.trainable_variables()
+    values = sess.run(variables)
+    return main_network_layers({variable.name.split(':')[0]: value for variable, value in zip(variables, values)})
+
+
+def train(trainer, trainer_kwargs, nb_actors, file=None, weights_refresh=WEIGHTS_REFRESH):
+    """
+    Trains like trainer.start, with the games played by nb_actors processes building their Trainer from
+    trainer_kwargs. Runs until trainer.num_episodes games have been received.
+    """
+    main_qn, target_qn, init, target_ops = trainer.build_training_graph()
+    training_registry = ModelRegistry(trainer.path)
+    first_step = training_registry.next_step('6')
+    episode_rewards = []
+    buffer = trainer.make_replay_buffer(main_qn.nb_inputs)
+    beta = trainer.start_beta
+    betaStep = (1 - trainer.start_beta) / trainer.annealings_steps
+    stepDrop = (trainer.start_E - trainer.end_E) / trainer.annealings_steps
+
+    context = get_context('spawn')
+    trainer_kwargs = dict(trainer_kwargs, log_queue=trainer.events.process_queue(context))
+    transitions_queue = context.Queue()
+    policy_queues = [context.Queue() for _ in range(nb_actors)]
+    stop_event = context.Event()
+    actors = [context.Process(target=_run_actor, args=(trainer_kwargs, policy_queue, transitions_queue, stop_event),
+                              daemon=True)
+              for policy_queue in policy_queues]
+
+    def publish(sess, total_steps):
+        if total_steps < trainer.pre_train_steps:
+            e = 1.0
+        else:
+            e = max(trainer.end_E, trainer.start_E - stepDrop * (total_steps - trainer.pre_train_steps))
+        weights = main_network_weights(sess)
+        for policy_queue in policy_queues:
+            policy_queue.put((weights, e))
+
+    with tf.Session() as sess:
+        sess.run(init)
+        main_qn.set_session(sess)
+        if trainer.load:
+            trainer.restore_training_model(sess, file)
+        publish(sess, 0)
+        for actor in actors:
+            actor.start()
+
+        total_steps = 0
+        nb_updates = 0
+        i = 0
+
+        def can_train():
+            # one update every update_freq actions after the pre-training steps, as in Trainer.start
+            nb_allowed = max(0, total_steps - trainer.pre_train_steps) // trainer.update_freq
+            return nb_updates < nb_allowed and len(buffer) >= trainer.batch_size
+
+        try:
+            while i < trainer.num_episodes:
+                # wait for games until an update is due, then only take those already received
+                block = not can_train()
+                while i < trainer.num_episodes:
+                    received = _receive(transitions_queue, actors, block)
+                    if received is None:
+                        break
+                    episode_buffer, rAll, nb_actions, actor_timers = received
+                    block = False
+                    buffer.extend(episode_buffer)
+                    phase_timers.merge(actor_timers)
+                    phase_timers.count('transitions', len(episode_buffer))
+                    episode_rewards.append(rAll)
+                    total_steps += nb_actions
+                    trainer.events.info('episode', episode=i, reward=rAll, transitions=len(episode_buffer),
+                                        total_steps=total_steps)
+                    if i % 200 == 0:
+                        trainer.save_checkpoint(sess, training_registry, first_step + i, episode_rewards)
+                        if isinstance(buffer, MemmapReplayBuffer):
+                            buffer.flush()
+                        episode_rewards = []
+                        trainer.events.info('checkpoint', episode=i)
+                    phase_timers.write_summary(main_qn.summary_writer, i)
+                    i += 1
+                if not can_train():
+                    continue
+
+                trainer.train_batch(sess, main_qn, target_qn, target_ops, buffer, beta)
+                beta = min(1.0, beta + betaStep)
+                nb_updates += 1
+                if nb_updates % weights_refresh == 0:
+                    publish(sess, total_steps)
+        finally:
+            stop_event.set()
+            for actor in actors:
+                actor.terminate()
+                actor.join()
+
+        trainer.events.info('distributed_training', total_steps=total_steps, nb_actors=nb_actors,
+                            nb_updates=nb_updates)
+        trainer.save_checkpoint(sess, training_registry, first_step + i - 1, episode_rewards)
+        if isinstance(buffer, MemmapReplayBuffer):
+            buffer.flush()
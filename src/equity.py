@@ -0,0 +1,239 @@
+"""
+Vectorized Monte Carlo equity engine, replacement for pypokerengine's estimate_hole_card_win_rate.
+
+Every simulation of an estimate is dealt at once as an array of card ids (see cards.card_ids to convert the string
+cards of a round_state), then all the hands are ranked in batch by the lookup tables of hand_evaluator.py. As in
+pypokerengine, a simulation counts as a win when no opponent has a strictly better hand.
+
+estimate_win_rate goes through the preflop and flop tables first, when they were built with enough simulations for
+the call, then through the process-wide equity_cache, so the same spot (up to a suit permutation) is only simulated
+again for a more precise estimate.
+estimate_win_rates does the same for every number of opponents from a single rollout.
+"""
+
+from collections import namedtuple
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+
+from cards import remaining_deck
+from equity_cache import canonical_key, equity_cache
+from flop_table import MAX_PLAYERS as FLOP_TABLE_MAX_PLAYERS, lookup_win_rates as lookup_flop_win_rates, \
+    table_nb_simulation as flop_table_nb_simulation
+from hand_evaluator import evaluate
+from preflop_table import lookup_win_rate, table_nb_simulation as preflop_table_nb_simulation
+
+
+EquityEstimate = namedtuple('EquityEstimate', ['win_rate', 'nb_simulation', 'error'])
+
+Z_SCORE = 1.96  # 95% confidence interval
+ADAPTIVE_BATCH_SIZE = 250
+MAX_ENUMERATION = 50000
+
+
+def _simulate_scores(nb_simulation, nb_opponents, hole, board, deck):
+    nb_missing = 5 - len(board)
+    order = np.argsort(np.random.random_sample((nb_simulation, len(deck))), axis=1)
+    drawn = deck[order[:, :nb_missing + 2 * nb_opponents]]
+
+    boards = np.hstack([np.broadcast_to(board, (nb_simulation, len(board))), drawn[:, :nb_missing]])
+    opponents_hole = drawn[:, nb_missing:].reshape(nb_simulation, nb_opponents, 2)
+
+    my_score = evaluate(np.hstack([np.broadcast_to(hole, (nb_simulation, 2)), boards]))
+    opponents_score = evaluate(np.concatenate(
+        [opponents_hole, np.broadcast_to(boards[:, None, :], (nb_simulation, nb_opponents, 5))], axis=2))
+    return my_score, opponents_score
+
+
+def _simulate_wins(nb_simulation, nb_opponents, hole, board, deck):
+    my_score, opponents_score = _simulate_scores(nb_simulation, nb_opponents, hole, board, deck)
+    return my_score >= opponents_score.max(axis=1)
+
+
+def _simulate_wins_by_opponents(nb_simulation, nb_opponents, hole, board, deck):
+    # the first k opponents of a simulation are a valid deal against k opponents, so the running maximum of the
+    # opponents scores gives the outcome for every opponent count at once
+    my_score, opponents_score = _simulate_scores(nb_simulation, nb_opponents, hole, board, deck)
+    return my_score[:, None] >= np.maximum.accumulate(opponents_score, axis=1)
+
+
+def _error(nb_wins, nb_simulation):
+    # Agresti-Coull interval, so that a spot that has only won or lost so far does not look exact
+    win_rate = (nb_wins + Z_SCORE ** 2 / 2) / (nb_simulation + Z_SCORE ** 2)
+    return Z_SCORE * np.sqrt(win_rate * (1 - win_rate) / (nb_simulation + Z_SCORE ** 2))
+
+
+def monte_carlo_win_rate(nb_simulation, nb_player, hole, board):
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    return float(np.mean(_simulate_wins(nb_simulation, nb_player - 1, hole, board, remaining_deck(hole, board))))
+
+
+def _comb(n, k):
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def nb_heads_up_outcomes(board):
+    deck_size = 50 - len(board)
+    nb_missing = 5 - len(board)
+    return _comb(deck_size, nb_missing) * _comb(deck_size - nb_missing, 2)
+
+
+def exact_heads_up_win_rate(hole, board):
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    deck = remaining_deck(hole, board)
+    nb_missing = 5 - len(board)
+
+    runouts = list(combinations(deck, nb_missing))
+    runouts = np.array(runouts, dtype=np.int64).reshape(len(runouts), nb_missing)
+    boards = np.hstack([np.broadcast_to(board, (len(runouts), len(board))), runouts])
+    opponents_hole = np.array(list(combinations(deck, 2)), dtype=np.int64)
+    # an opponent hand is only possible with the runouts that do not use its cards
+    possible = ~(opponents_hole[None, :, :, None] == runouts[:, None, None, :]).any(axis=(2, 3))
+
+    my_score = evaluate(np.hstack([np.broadcast_to(hole, (len(boards), 2)), boards]))
+    opponents_score = evaluate(np.concatenate([
+        np.broadcast_to(opponents_hole, (len(boards),) + opponents_hole.shape),
+        np.broadcast_to(boards[:, None, :], (len(boards), len(opponents_hole), 5))], axis=2))
+    return float(((my_score[:, None] >= opponents_score) & possible).sum() / possible.sum())
+
+
+def adaptive_win_rate(nb_player, hole, board, tolerance, max_simulation, max_enumeration=MAX_ENUMERATION):
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    if nb_player == 2:
+        nb_outcomes = nb_heads_up_outcomes(board)
+        if nb_outcomes <= max_enumeration:
+            return EquityEstimate(exact_heads_up_win_rate(hole, board), nb_outcomes, 0.0)
+
+    deck = remaining_deck(hole, board)
+    nb_wins = nb_simulation = 0
+    error = 1.0
+    while nb_simulation < max_simulation and error > tolerance:
+        batch_size = min(ADAPTIVE_BATCH_SIZE, max_simulation - nb_simulation)
+        nb_wins += int(_simulate_wins(batch_size, nb_player - 1, hole, board, deck).sum())
+        nb_simulation += batch_size
+        error = _error(nb_wins, nb_simulation)
+    return EquityEstimate(nb_wins / nb_simulation, nb_simulation, float(error))
+
+
+def _table_estimate(win_rate, nb_simulation):
+    """EquityEstimate of a win rate read from a table built with nb_simulation simulations per entry."""
+    return EquityEstimate(win_rate, nb_simulation, float(_error(win_rate * nb_simulation, nb_simulation)))
+
+
+def _is_precise_enough(estimate, nb_simulation, tolerance):
+    """
+    Whether a cached or precomputed estimate answers a request: within tolerance, or from at least nb_simulation
+    simulations. Only exact enumerations have an error of 0.
+    """
+    if estimate is None:
+        return False
+    if tolerance is not None:
+        return estimate.error <= tolerance
+    return estimate.nb_simulation >= nb_simulation or estimate.error == 0
+
+
+def estimate_equity(nb_simulation, nb_player, hole, board, tolerance=None):
+    """
+    Win rate of hole against nb_player - 1 random hands, as an EquityEstimate.
+
+    With tolerance=None, nb_simulation simulations are always run. Otherwise, sampling stops as soon as the half
+    width of the 95% confidence interval is below tolerance (nb_simulation is then the maximum number of
+    simulations), and heads-up spots with few enough runouts are enumerated exactly (error 0). Preflop and flop
+    spots are read from the precomputed tables when they were built with enough simulations for the request, and
+    report them with their error.
+    """
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    if len(board) == 0:
+        win_rate = lookup_win_rate(hole, nb_player)
+        if win_rate is not None:
+            estimate = _table_estimate(win_rate, preflop_table_nb_simulation())
+            if _is_precise_enough(estimate, nb_simulation, tolerance):
+                return estimate
+    elif len(board) == 3 and nb_player <= FLOP_TABLE_MAX_PLAYERS:
+        win_rates = lookup_flop_win_rates(hole, board)
+        if win_rates is not None:
+            estimate = _table_estimate(float(win_rates[nb_player - 2]), flop_table_nb_simulation())
+            if _is_precise_enough(estimate, nb_simulation, tolerance):
+                return estimate
+    key = canonical_key(hole, board, nb_player)
+    estimate = equity_cache.get(key)
+    if _is_precise_enough(estimate, nb_simulation, tolerance):
+        return estimate
+
+    if tolerance is None:
+        wins = _simulate_wins(nb_simulation, nb_player - 1, hole, board, remaining_deck(hole, board))
+        estimate = EquityEstimate(float(wins.mean()), nb_simulation, float(_error(wins.sum(), nb_simulation)))
+    else:
+        estimate = adaptive_win_rate(nb_player, hole, board, tolerance, max_simulation=nb_simulation)
+    equity_cache.put(key, estimate)
+    return estimate
+
+
+def estimate_win_rate(nb_simulation, nb_player, hole, board, tolerance=None):
+    return estimate_equity(nb_simulation, nb_player, hole, board, tolerance).win_rate
+
+
+def estimate_equities(nb_simulation, nb_player, hole, board, tolerance=None):
+    """
+    EquityEstimates of hole against 1 to nb_player - 1 random hands, indexed by number of opponents - 1.
+
+    Every simulation deals one board and nb_player - 1 opponent hands, and serves all the opponent counts, so a
+    single rollout answers for any number of live players at the table. Each count is also stored in the
+    equity_cache, where later estimate_equity calls find it. tolerance works as in estimate_equity, sampling until
+    every count is precise enough.
+    """
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    nb_counts = nb_player - 1
+    estimates = [None] * nb_counts
+    if len(board) == 0:
+        for i in range(nb_counts):
+            win_rate = lookup_win_rate(hole, i + 2)
+            if win_rate is not None:
+                estimate = _table_estimate(win_rate, preflop_table_nb_simulation())
+                if _is_precise_enough(estimate, nb_simulation, tolerance):
+                    estimates[i] = estimate
+    elif len(board) == 3 and nb_player <= FLOP_TABLE_MAX_PLAYERS:
+        win_rates = lookup_flop_win_rates(hole, board)
+        if win_rates is not None:
+            for i in range(nb_counts):
+                estimate = _table_estimate(float(win_rates[i]), flop_table_nb_simulation())
+                if _is_precise_enough(estimate, nb_simulation, tolerance):
+                    estimates[i] = estimate
+    keys = [canonical_key(hole, board, i + 2) for i in range(nb_counts)]
+    for i in range(nb_counts):
+        if estimates[i] is None:
+            estimate = equity_cache.get(keys[i])
+            if _is_precise_enough(estimate, nb_simulation, tolerance):
+                estimates[i] = estimate
+    if all(estimate is not None for estimate in estimates):
+        return estimates
+
+    deck = remaining_deck(hole, board)
+    if tolerance is None:
+        nb_wins = _simulate_wins_by_opponents(nb_simulation, nb_counts, hole, board, deck).sum(axis=0)
+        nb_done = nb_simulation
+    else:
+        nb_wins = np.zeros(nb_counts, dtype=np.int64)
+        nb_done = 0
+        while nb_done < nb_simulation and _error(nb_wins, max(nb_done, 1)).max() > tolerance:
+            batch_size = min(ADAPTIVE_BATCH_SIZE, nb_simulation - nb_done)
+            nb_wins += _simulate_wins_by_opponents(batch_size, nb_counts, hole, board, deck).sum(axis=0)
+            nb_done += batch_size
+    errors = _error(nb_wins, nb_done)
+
+    for i in range(nb_counts):
+        if estimates[i] is None:
+            estimates[i] = EquityEstimate(float(nb_wins[i] / nb_done), nb_done, float(errors[i]))
+            equity_cache.put(keys[i], estimates[i])
+    return estimates
+
+
+def estimate_win_rates(nb_simulation, nb_player, hole, board, tolerance=None):
+    return np.array([estimate.win_rate for estimate in estimate_equities(nb_simulation, nb_player, hole, board,
+                                                                            tolerance)])
@@ -0,0 +1,87 @@
+"""
+Process-wide cache of equity estimates.
+
+Entries are keyed by the canonical (hole, board, nb_player) tuple: the suits are relabelled with the permutation
+that gives the smallest sorted card ids, so every suit permutation of a spot (e.g. SA SK on SQ H7 D2 and HA HK on
+HQ S7 C2) shares one entry. The cache keeps at most max_size entries and evicts the least recently used one first.
+It can be saved to and reloaded from disk so that the spots seen during a run are reused by the next one, and it can be
+shared by games running in several threads.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from itertools import permutations
+
+import numpy as np
+
+from cards import NB_CARDS
+
+_SUIT_PERMUTATIONS = np.array(list(permutations(range(4))))
+_PERMUTED_CARDS = (np.arange(NB_CARDS) & ~3) | _SUIT_PERMUTATIONS[:, np.arange(NB_CARDS) & 3]
+
+
+def canonical_key(hole, board, nb_player):
+    hole = np.asarray(hole, dtype=np.int64)
+    board = np.asarray(board, dtype=np.int64)
+    candidates = np.hstack([np.sort(_PERMUTED_CARDS[:, hole], axis=1), np.sort(_PERMUTED_CARDS[:, board], axis=1)])
+    best = candidates[np.lexsort(candidates.T[::-1])[0]].tolist()
+    return tuple(best[:len(hole)]), tuple(best[len(hole):]), nb_player
+
+
+class EquityCache:
+    def __init__(self, max_size=200000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock:
+            items = list(self.entries.items())
+        with open(path, 'wb') as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as f:
+            for key, value in pickle.load(f):
+                self.put(key, value)
+        return len(self.entries)
+
+
+equity_cache = EquityCache()
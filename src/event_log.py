@@ -0,0 +1,141 @@
+"""
+Leveled, structured event log of the training loops, written by a background thread.
+
+An event is a name and a few fields: `events.debug('action', total_steps=12)`. It is dropped right away when its level
+is below the level of the log, or by its sampling rate: with sample_rates={'action': 0.01} one 'action' event out of
+100 is kept. Sampling counts the events instead of drawing random numbers, so that it never changes the random state
+of a seeded run. The kept events are queued and a writer thread appends them in batches, as JSON lines
+{"time": ..., "level": "debug", "event": "action", "total_steps": 12}, to a file or to stdout. The training loop never
+waits for the terminal or the disk, and the output can be parsed back line by line.
+
+Worker processes (evaluation pool, training actors) share the log of the parent process: process_queue returns a
+multiprocessing queue that the parent forwards to its writer, and an EventLog built on it in a worker only filters its
+events and sends them there, with the pid of the worker, so that one file (or stdout) gets whole lines from all the
+processes.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from queue import Empty, Queue
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+
+
+class EventLog:
+    def __init__(self, path=None, level='info', sample_rates=None, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, queue=None):
+        """
+        path of the JSON lines file, appended to, or None for stdout. level is a name of LEVELS. queue is the
+        process_queue of the log of a parent process, which the events are sent to instead of being written here.
+        """
+        self.level = LEVELS[level]
+        self.sample_every = {name: max(1, int(round(1 / rate))) for name, rate in (sample_rates or {}).items()
+                             if rate > 0}
+        self.muted = {name for name, rate in (sample_rates or {}).items() if rate <= 0}
+        self.seen = {}
+        self.pid = None
+        self.shared_queue = None
+        self.forwarder = None
+        if queue is not None:
+            self.pid = os.getpid()
+            self.queue = queue
+            self.running = False
+            return
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.output = open(path, 'a') if path else sys.stdout
+        self.queue = Queue()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, name, **fields):
+        if level < self.level or name in self.muted:
+            return
+        every = self.sample_every.get(name)
+        if every is not None:
+            seen = self.seen.get(name, 0)
+            self.seen[name] = seen + 1
+            if seen % every:
+                return
+        event = {'time': time.time(), 'level': LEVEL_NAMES.get(level, level), 'event': name}
+        if self.pid is not None:
+            event['pid'] = self.pid
+        event.update(fields)
+        self.queue.put(event)
+
+    def debug(self, name, **fields):
+        self.log(DEBUG, name, **fields)
+
+    def info(self, name, **fields):
+        self.log(INFO, name, **fields)
+
+    def warning(self, name, **fields):
+        self.log(WARNING, name, **fields)
+
+    def process_queue(self, context):
+        """Queue of context (a multiprocessing context) for the EventLogs of worker processes, created once."""
+        if self.shared_queue is None:
+            self.shared_queue = context.Queue()
+            self.forwarder = threading.Thread(target=self._forward, daemon=True)
+            self.forwarder.start()
+        return self.shared_queue
+
+    def close(self):
+        """Writes the queued events and stops the writer thread."""
+        if not self.running:
+            return
+        if self.shared_queue is not None:
+            self.shared_queue.put(None)
+            self.forwarder.join()
+        self.running = False
+        self.queue.put(None)
+        self.thread.join()
+        if self.output is not sys.stdout:
+            self.output.close()
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _forward(self):
+        for event in iter(self.shared_queue.get, None):
+            self.queue.put(event)
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            batch = [fields for fields in self._next_batch() if fields is not None]
+            if batch:
+                self.output.write(''.join(json.dumps(fields, default=_to_json) + '\n' for fields in batch))
+                self.output.flush()
+
+
+def _to_json(value):
+    """numpy scalars and arrays as their Python values, anything else as its str."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
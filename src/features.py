@@ -0,0 +1,185 @@
+"""
+Inputs of the DQN players, built from a feature schema declared once per version.
+
+A schema is a tuple of feature names from FEATURE_WIDTHS. A Featurizer lays the features of its schema out as
+consecutive columns and writes them in a float32 array. fill builds the inputs of one decision, in a new array or a
+preallocated row such as a row of the observations of VecEnv. fill_batch builds the inputs of many logged decisions
+at once. The values of the seats, pots and actions of every decision are read in one pass, and each feature is then
+computed for the whole batch with numpy. fill_terminal builds the inputs that follow the last action of a round.
+
+Features:
+  dealer_btn                  seat of the player minus the seat of the dealer
+  hand_strength               estimated win rate, divided by the number of players it was estimated against
+  call_amount                 amount to call, or the minimum raise when calling is free
+  pots                        main pot and side pots
+  agressivity                 overall aggressiveness of the opponents
+  round_ratio                 round count over the maximum number of rounds
+  street                      one-hot preflop, flop, turn, river
+  player_stack                stack of the player over the starting stack
+  other_stacks                stacks of the opponents over the starting stack, in seat order
+  other_participating_stacks  same, 0 for the opponents who are not participating anymore
+  participating_players       number of participating players, at least 2
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+STREETS = {'preflop': 0, 'flop': 1, 'turn': 2, 'river': 3}
+NO_STREET = -1
+STREET_ROWS = {street: [int(street == i) for i in range(len(STREETS))] for street in [NO_STREET, *STREETS.values()]}
+TERMINAL_PARTICIPATING_PLAYERS = 5
+
+# None: one column per opponent
+FEATURE_WIDTHS = {
+    'dealer_btn': 1,
+    'hand_strength': 1,
+    'call_amount': 1,
+    'pots': 1,
+    'agressivity': 1,
+    'round_ratio': 1,
+    'street': len(STREETS),
+    'player_stack': 1,
+    'other_stacks': None,
+    'other_participating_stacks': None,
+    'participating_players': 1,
+}
+
+DecisionValues = namedtuple('DecisionValues', ['pots', 'call_amount', 'street', 'round_count', 'dealer_btn',
+                                               'player_stack', 'other_stacks', 'other_participating',
+                                               'nb_participating'])
+
+
+def pot_amount(round_state):
+    return round_state['pot']['main']['amount'] + sum(pot['amount'] for pot in round_state['pot']['side'])
+
+
+def call_amount(valid_actions):
+    return valid_actions[1]['amount'] if valid_actions[1]['amount'] > 0 else valid_actions[2]['amount']['min']
+
+
+def decision_values(round_state, valid_actions, uuid):
+    """The values of round_state and valid_actions that the features are computed from."""
+    player_stack = 0
+    other_stacks = []
+    other_participating = []
+    nb_participating = 0
+    for seat in round_state['seats']:
+        participating = seat['state'] == 'participating'
+        nb_participating += participating
+        if seat['uuid'] == uuid:
+            player_stack = seat['stack']
+        else:
+            other_stacks.append(seat['stack'])
+            other_participating.append(participating)
+    return DecisionValues(pot_amount(round_state), call_amount(valid_actions), STREETS[round_state['street']],
+                          round_state['round_count'], round_state['dealer_btn'], player_stack, other_stacks,
+                          other_participating, nb_participating)
+
+
+class Featurizer:
+    def __init__(self, schema, nb_players, start_stack, max_round):
+        self.schema = tuple(schema)
+        self.nb_players = nb_players
+        self.start_stack = start_stack
+        self.max_round = max_round
+
+        self.columns = {}
+        offset = 0
+        for name in self.schema:
+            if name not in FEATURE_WIDTHS:
+                raise ValueError('unknown feature {0}'.format(name))
+            width = FEATURE_WIDTHS[name]
+            if width is None:
+                width = nb_players - 1
+            self.columns[name] = slice(offset, offset + width)
+            offset += width
+        self.nb_features = offset
+
+    def new_inputs(self, nb_decisions=None):
+        if nb_decisions is None:
+            return np.zeros(self.nb_features, dtype=np.float32)
+        return np.zeros((nb_decisions, self.nb_features), dtype=np.float32)
+
+    def fill(self, round_state, valid_actions, uuid, hand_strength, agressivity=0, seat_position=0, out=None):
+        """Inputs of one decision of the player uuid, written in out when given."""
+        return self.fill_values(decision_values(round_state, valid_actions, uuid), hand_strength, agressivity,
+                                seat_position, out)
+
+    def fill_values(self, values, hand_strength, agressivity=0, seat_position=0, out=None):
+        """Same as fill, from the decision_values of the decision."""
+        if out is None:
+            out = self.new_inputs()
+        out[:] = self._row(values, seat_position - values.dealer_btn, hand_strength, agressivity)
+        return out
+
+    def fill_batch(self, round_states, valid_actions, uuid, hand_strengths, agressivities=0, seat_positions=0,
+                   out=None):
+        """
+        Inputs of logged decisions of the player uuid, one row per round state. hand_strengths, agressivities and
+        seat_positions are given per decision or once for all of them.
+        """
+        if out is None:
+            out = self.new_inputs(len(round_states))
+        values = DecisionValues(*map(np.array, zip(*[decision_values(round_state, actions, uuid)
+                                                     for round_state, actions in zip(round_states, valid_actions)])))
+        self._write_columns(out, values, np.asarray(seat_positions) - values.dealer_btn, hand_strengths,
+                            agressivities)
+        return out
+
+    def fill_terminal(self, players, uuid, dealer_btn, hand_strength, agressivity=0, out=None):
+        """Inputs after the end of a round, from the seats of the table: no pot, no street, no call."""
+        if out is None:
+            out = self.new_inputs()
+        player_stack = [player.stack for player in players if player.uuid == uuid][0]
+        other_stacks = [player.stack for player in players if player.uuid != uuid]
+        values = DecisionValues(0, 0, NO_STREET, self.max_round, dealer_btn, player_stack, other_stacks,
+                                [True] * len(other_stacks), TERMINAL_PARTICIPATING_PLAYERS)
+        out[:] = self._row(values, dealer_btn, hand_strength, agressivity)
+        return out
+
+    def _row(self, values, dealer, hand_strength, agressivity):
+        scalars = {
+            'dealer_btn': dealer,
+            'hand_strength': hand_strength,
+            'call_amount': values.call_amount,
+            'pots': values.pots,
+            'agressivity': agressivity,
+            'round_ratio': values.round_count / self.max_round,
+            'player_stack': values.player_stack / self.start_stack,
+            'participating_players': 2 if values.nb_participating == 1 else values.nb_participating,
+        }
+        row = []
+        for name in self.schema:
+            if name in scalars:
+                row.append(scalars[name])
+            elif name == 'street':
+                row += STREET_ROWS[values.street]
+            elif name == 'other_stacks':
+                row += [stack / self.start_stack for stack in values.other_stacks]
+            else:
+                row += [stack / self.start_stack if participating else 0
+                        for stack, participating in zip(values.other_stacks, values.other_participating)]
+        return row
+
+    def _write_columns(self, out, values, dealer, hand_strength, agressivity):
+        scalars = {
+            'dealer_btn': dealer,
+            'hand_strength': hand_strength,
+            'call_amount': values.call_amount,
+            'pots': values.pots,
+            'agressivity': agressivity,
+            'round_ratio': values.round_count / self.max_round,
+            'player_stack': values.player_stack / self.start_stack,
+            'participating_players': np.where(values.nb_participating == 1, 2, values.nb_participating),
+        }
+        for name in self.schema:
+            column = self.columns[name]
+            if name in scalars:
+                out[:, column.start] = scalars[name]
+            elif name == 'street':
+                out[:, column] = values.street[:, np.newaxis] == np.arange(len(STREETS))
+            elif name == 'other_stacks':
+                out[:, column] = values.other_stacks / self.start_stack
+            else:
+                out[:, column] = np.where(values.other_participating, values.other_stacks / self.start_stack, 0)
@@ -0,0 +1,153 @@
+"""
+Precomputed flop win rates for every suit-canonical (hole, flop) combination, from 2 to 10 players.
+
+Two memory-mapped files are stored in data/:
+    - flop_index.npy: (169, 22100) int32, row of flop_equity.npy for each canonical starting hand and each flop
+      (in colex order of its sorted card ids), -1 when the flop uses a card of the hand
+    - flop_equity.npy: (nb_rows, 9) float16, one row per suit-canonical (hole, flop), the last axis is the number
+      of players at the table minus 2
+    - flop_simulations.npy: the number of simulations of every row, from which equity.py reports the error of the
+      table, and without which the table is not used
+The files are opened with mmap_mode='r', so every process reading them shares the pages of the OS cache instead of
+loading its own copy, and a lookup is a couple of array reads. Turn and river spots are still simulated live by
+equity.estimate_equity.
+
+The files are not versioned (about 40MB). To build them, run this from the root of the repository:
+`python src/flop_table.py [nb_simulation] [nb_workers]`
+"""
+
+import os
+import sys
+from itertools import combinations, permutations
+from math import factorial
+from multiprocessing import Pool
+
+import numpy as np
+
+from cards import NB_CARDS
+
+MIN_PLAYERS = 2
+MAX_PLAYERS = 10
+NB_FLOPS = 22100
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+INDEX_PATH = os.path.join(DATA_DIR, 'flop_index.npy')
+EQUITY_PATH = os.path.join(DATA_DIR, 'flop_equity.npy')
+NB_SIMULATION_PATH = os.path.join(DATA_DIR, 'flop_simulations.npy')
+
+_COMB = np.array([[factorial(n) // (factorial(k) * factorial(n - k)) if k <= n else 0 for k in range(4)]
+                  for n in range(NB_CARDS)], dtype=np.int64)
+_COMB_LIST = _COMB.tolist()
+_SUIT_PERMUTATIONS = np.array(list(permutations(range(4))))
+_PERMUTED_CARDS = (np.arange(NB_CARDS) & ~3) | _SUIT_PERMUTATIONS[:, np.arange(NB_CARDS) & 3]
+_PERMUTED_CARDS_LIST = _PERMUTED_CARDS.tolist()
+
+
+def colex(cards):
+    """Index of sorted card ids among the combinations of the same size, in colex order."""
+    cards = np.asarray(cards)
+    return sum(_COMB[cards[..., i], i + 1] for i in range(cards.shape[-1]))
+
+
+def _combinations(nb_cards):
+    combos = np.array(list(combinations(range(NB_CARDS), nb_cards)), dtype=np.int64)
+    return combos[np.argsort(colex(combos))]
+
+
+HOLES = _combinations(2)
+FLOPS = _combinations(3)
+
+
+def _hole_classes():
+    # every hand is mapped to the smallest of its suit permutations, and to one permutation that reaches it
+    codes = colex(np.sort(_PERMUTED_CARDS[:, HOLES], axis=2))
+    perms = codes.argmin(axis=0)
+    representatives, classes = np.unique(codes.min(axis=0), return_inverse=True)
+    return HOLES[representatives], classes.reshape(-1), perms
+
+
+REPRESENTATIVES, _HOLE_CLASS, _HOLE_PERM = _hole_classes()
+_HOLE_CLASS_LIST = _HOLE_CLASS.tolist()
+_HOLE_PERM_LIST = _HOLE_PERM.tolist()
+
+
+def _canonical_codes(hole):
+    flops = FLOPS[~np.isin(FLOPS, hole).any(axis=1)]
+    candidates = colex(np.sort(_PERMUTED_CARDS[:, hole], axis=1))[:, None] * NB_FLOPS \
+        + colex(np.sort(_PERMUTED_CARDS[:, flops], axis=2))
+    return colex(flops), candidates.min(axis=0)
+
+
+def load_tables(index_path=INDEX_PATH, equity_path=EQUITY_PATH, nb_simulation_path=NB_SIMULATION_PATH):
+    if not all(os.path.exists(path) for path in (index_path, equity_path, nb_simulation_path)):
+        return None, None, None
+    return np.load(index_path, mmap_mode='r'), np.load(equity_path, mmap_mode='r'), int(np.load(nb_simulation_path))
+
+
+_index, _equity, _nb_simulation = load_tables()
+
+
+def table_nb_simulation():
+    """Number of simulations of every row of the table."""
+    return _nb_simulation
+
+
+def lookup_win_rates(hole, flop):
+    """Win rates against 1 to 9 opponents, indexed by number of opponents - 1, or None when not in the table."""
+    if _index is None:
+        return None
+    first, second = int(hole[0]), int(hole[1])
+    hole_code = _COMB_LIST[min(first, second)][1] + _COMB_LIST[max(first, second)][2]
+    permuted = _PERMUTED_CARDS_LIST[_HOLE_PERM_LIST[hole_code]]
+    flop = sorted(permuted[int(card)] for card in flop)
+    row = _index[_HOLE_CLASS_LIST[hole_code], _COMB_LIST[flop[0]][1] + _COMB_LIST[flop[1]][2] + _COMB_LIST[flop[2]][3]]
+    if row < 0:
+        return None
+    win_rates = _equity[row].astype(np.float64)
+    return None if np.isnan(win_rates).any() else win_rates
+
+
+def _row_win_rates(args):
+    from equity import _simulate_wins_by_opponents
+    from cards import remaining_deck
+
+    code, nb_simulation = args
+    hole, flop = HOLES[code // NB_FLOPS], FLOPS[code % NB_FLOPS]
+    return _simulate_wins_by_opponents(nb_simulation, MAX_PLAYERS - 1, hole, flop,
+                                       remaining_deck(hole, flop)).mean(axis=0)
+
+
+def build_tables(nb_simulation=1000, nb_workers=None, index_path=INDEX_PATH, equity_path=EQUITY_PATH,
+                 nb_simulation_path=NB_SIMULATION_PATH):
+    flop_codes, canonical_codes = [], []
+    for hole in REPRESENTATIVES:
+        flops, codes = _canonical_codes(hole)
+        flop_codes.append(flops)
+        canonical_codes.append(codes)
+    rows_codes, rows = np.unique(np.concatenate(canonical_codes), return_inverse=True)
+    rows = rows.reshape(-1)
+    print('{0} canonical (hole, flop) combinations'.format(len(rows_codes)))
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    index = np.full((len(REPRESENTATIVES), NB_FLOPS), -1, dtype=np.int32)
+    start = 0
+    for hole_class, flops in enumerate(flop_codes):
+        index[hole_class, flops] = rows[start:start + len(flops)]
+        start += len(flops)
+    np.save(index_path, index)
+
+    equity = np.lib.format.open_memmap(equity_path, mode='w+', dtype=np.float16,
+                                       shape=(len(rows_codes), MAX_PLAYERS - MIN_PLAYERS + 1))
+    with Pool(nb_workers) as pool:
+        tasks = ((int(code), nb_simulation) for code in rows_codes)
+        for row, win_rates in enumerate(pool.imap(_row_win_rates, tasks, chunksize=256)):
+            equity[row] = win_rates
+            if row % 10000 == 0:
+                print('built row {0}/{1}'.format(row, len(rows_codes)))
+    equity.flush()
+    np.save(nb_simulation_path, nb_simulation)
+    return index, equity
+
+
+if __name__ == '__main__':
+    build_tables(nb_simulation=int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                 nb_workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
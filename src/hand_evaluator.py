@@ -0,0 +1,189 @@
+"""
+Table-driven 7-card hand evaluator working on the integer cards of cards.py.
+
+Every rank gets a key such that the sum of the keys of 7 cards identifies their rank multiset, and every suit
+gets an octal digit so that the sum of the suit keys tells whether a flush is possible. A hand is then ranked with
+a few array lookups:
+    - no flush: _NOFLUSH[sum of rank keys]
+    - flush:    _FLUSH[13-bit rank mask of the flush suit]
+The tables hold the rank of the hand among the 4824 distinct values a 7-card hand can take, from 1 to 4824 (royal
+flush), so scores of different hands can be compared directly. With 7 cards a flush excludes a full house or a four
+of a kind, so the flush score always wins when there is one. The tables are built once at import time (about a
+second).
+"""
+
+import numpy as np
+
+from cards import NB_CARDS
+
+HIGHCARD, ONEPAIR, TWOPAIR, THREECARD, STRAIGHT, FLASH, FULLHOUSE, FOURCARD, STRAIGHTFLASH = range(9)
+HAND_STRENGTH_MAP = ['HIGHCARD', 'ONEPAIR', 'TWOPAIR', 'THREECARD', 'STRAIGHT', 'FLASH', 'FULLHOUSE', 'FOURCARD',
+                     'STRAIGHTFLASH']
+
+RANK_KEYS = np.array([0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181], dtype=np.int64)
+SUIT_KEYS = np.array([1, 8, 64, 512], dtype=np.int64)
+
+_RANK_RANGE = np.arange(13)
+_DESC_RANKS = np.arange(12, -1, -1)
+
+_CARD_RANK_KEY = RANK_KEYS[np.arange(NB_CARDS) >> 2]
+_CARD_SUIT_KEY = SUIT_KEYS[np.arange(NB_CARDS) & 3]
+_CARD_SUIT = np.arange(NB_CARDS) & 3
+_CARD_RANK_BIT = 1 << (np.arange(NB_CARDS) >> 2)
+
+
+def _pack(*ranks):
+    score = 0
+    for rank in ranks:
+        score = (score << 4) | rank
+    return score
+
+
+def _straight_high(masks):
+    high = np.zeros(len(masks), dtype=np.int64)
+    high[masks & 0b1000000001111 == 0b1000000001111] = 3 + 1
+    for rank in range(4, 13):
+        high[(masks >> (rank - 4)) & 0b11111 == 0b11111] = rank + 1
+    return high
+
+
+def _top_ranks(masks, nb_ranks):
+    ranks = -np.sort(-np.where((masks[:, None] >> _DESC_RANKS) & 1, _DESC_RANKS, -1), axis=1)[:, :nb_ranks]
+    return [np.maximum(ranks[:, i], 0) for i in range(nb_ranks)]
+
+
+def _rank_multisets():
+    multisets = []
+
+    def fill(counts, rank, nb_cards):
+        if rank == 13:
+            if nb_cards == 7:
+                multisets.append(list(counts))
+            return
+        for count in range(min(4, 7 - nb_cards) + 1):
+            counts[rank] = count
+            fill(counts, rank + 1, nb_cards + count)
+        counts[rank] = 0
+
+    fill([0] * 13, 0, 0)
+    return np.array(multisets, dtype=np.int64)
+
+
+def _noflush_scores(counts):
+    rank_mask = ((counts > 0) << _RANK_RANGE).sum(axis=1)
+    keys = -np.sort(-np.where(counts > 0, counts * 16 + _RANK_RANGE, -1), axis=1)[:, :5]
+    group_sizes = np.where(keys >= 0, keys >> 4, 0)
+    group_ranks = np.where(keys >= 0, keys & 15, 0)
+    g = [group_ranks[:, i] for i in range(5)]
+    straight_high = _straight_high(rank_mask)
+
+    conditions = [
+        group_sizes[:, 0] == 4,
+        (group_sizes[:, 0] == 3) & (group_sizes[:, 1] >= 2),
+        straight_high > 0,
+        group_sizes[:, 0] == 3,
+        (group_sizes[:, 0] == 2) & (group_sizes[:, 1] == 2),
+        group_sizes[:, 0] == 2,
+    ]
+    categories = [FOURCARD, FULLHOUSE, STRAIGHT, THREECARD, TWOPAIR, ONEPAIR]
+    tie_breaks = [
+        _pack(g[0], group_ranks[:, 1:].max(axis=1)),
+        _pack(g[0], g[1]),
+        _pack(straight_high),
+        _pack(g[0], g[1], g[2]),
+        _pack(g[0], g[1], group_ranks[:, 2:].max(axis=1)),
+        _pack(g[0], g[1], g[2], g[3]),
+    ]
+    category = np.select(conditions, categories, HIGHCARD)
+    return (category << 20) | np.select(conditions, tie_breaks, _pack(*_top_ranks(rank_mask, 5)))
+
+
+def _flush_scores(masks):
+    straight_high = _straight_high(masks)
+    return np.where(straight_high > 0, (STRAIGHTFLASH << 20) | straight_high,
+                    (FLASH << 20) | _pack(*_top_ranks(masks, 5)))
+
+
+def _build_tables():
+    counts = _rank_multisets()
+    noflush_keys = counts @ RANK_KEYS
+    assert len(np.unique(noflush_keys)) == len(noflush_keys), 'rank keys are not collision free'
+
+    flush_masks = np.arange(1 << 13)
+    flush_masks = flush_masks[((flush_masks[:, None] >> _RANK_RANGE) & 1).sum(axis=1) >= 5]
+
+    raw_scores = np.concatenate([_noflush_scores(counts), _flush_scores(flush_masks)])
+    _, dense = np.unique(raw_scores, return_inverse=True)
+    dense = (dense.reshape(-1) + 1).astype(np.uint16)
+
+    noflush = np.zeros(noflush_keys.max() + 1, dtype=np.uint16)
+    noflush[noflush_keys] = dense[:len(counts)]
+    flush = np.zeros(1 << 13, dtype=np.uint16)
+    flush[flush_masks] = dense[len(counts):]
+
+    suit_sums = np.arange(7 * SUIT_KEYS[-1] + 1)
+    flush_suit = np.full(len(suit_sums), -1, dtype=np.int64)
+    for suit in range(4):
+        flush_suit[(suit_sums >> (3 * suit)) & 7 >= 5] = suit
+
+    category_bounds = np.searchsorted(np.unique(raw_scores) >> 20, np.arange(1, 9)) + 1
+    return noflush, flush, flush_suit, category_bounds
+
+
+_NOFLUSH, _FLUSH, _FLUSH_SUIT, _CATEGORY_BOUNDS = _build_tables()
+_RANK_KEY_LIST = _CARD_RANK_KEY.tolist()
+_SUIT_KEY_LIST = _CARD_SUIT_KEY.tolist()
+
+
+def evaluate(cards):
+    """Ranks hands of 7 card ids along the last axis, higher is better."""
+    cards = np.asarray(cards)
+    score = _NOFLUSH[_CARD_RANK_KEY[cards].sum(axis=-1)]
+    flush_suit = _FLUSH_SUIT[_CARD_SUIT_KEY[cards].sum(axis=-1)]
+    flush_mask = (_CARD_RANK_BIT[cards] * (_CARD_SUIT[cards] == flush_suit[..., None])).sum(axis=-1)
+    return np.where(flush_suit >= 0, _FLUSH[flush_mask], score)
+
+
+def _partial_keys(cards):
+    cards = np.asarray(cards)
+    suit_masks = (_CARD_RANK_BIT[cards][..., None] * (_CARD_SUIT[cards][..., None] == np.arange(4))).sum(axis=-2)
+    return _CARD_RANK_KEY[cards].sum(axis=-1), _CARD_SUIT_KEY[cards].sum(axis=-1), suit_masks
+
+
+def evaluate_pairs(boards, holes):
+    """
+    Scores of every (board, hole) pair, as a (len(boards), len(holes)) array, for boards of 5 card ids and holes of
+    2 card ids. The keys of the boards and of the holes are summed once each, so this is much cheaper than evaluating
+    the len(boards) * len(holes) hands one by one. Pairs that share a card get a meaningless score, to be masked out
+    by the caller.
+    """
+    board_rank_key, board_suit_key, board_suit_masks = _partial_keys(boards)
+    hole_rank_key, hole_suit_key, hole_suit_masks = _partial_keys(holes)
+    score = np.take(_NOFLUSH, board_rank_key[:, None] + hole_rank_key, mode='clip')
+    flush_suit = _FLUSH_SUIT[board_suit_key[:, None] + hole_suit_key]
+    flush_boards, flush_holes = np.nonzero(flush_suit >= 0)
+    suits = flush_suit[flush_boards, flush_holes]
+    score[flush_boards, flush_holes] = \
+        _FLUSH[board_suit_masks[flush_boards, suits] | hole_suit_masks[flush_holes, suits]]
+    return score
+
+
+def evaluate_hand(cards):
+    """Scalar version of evaluate for a single list of card ids."""
+    suit_key = 0
+    rank_key = 0
+    for card in cards:
+        suit_key += _SUIT_KEY_LIST[card]
+        rank_key += _RANK_KEY_LIST[card]
+    flush_suit = _FLUSH_SUIT[suit_key]
+    if flush_suit < 0:
+        return int(_NOFLUSH[rank_key])
+    flush_mask = 0
+    for card in cards:
+        if card & 3 == flush_suit:
+            flush_mask |= 1 << (card >> 2)
+    return int(_FLUSH[flush_mask])
+
+
+def hand_category(score):
+    return np.searchsorted(_CATEGORY_BOUNDS, score, side='right')
@@ -0,0 +1,225 @@
+"""
+Columnar hand histories of training and evaluation games, written in chunks and read back as numpy batches.
+
+A HandRecorder gathers the hands of its games in Python lists and writes every chunk_size hands as one compressed
+.npz file of the directory, named after the run (start time, process id and recorder of the process) and the chunk
+index, so that several runs and processes can write to the same directory, and a game is identified by its run and
+game columns. A hand is begun with the stacks and hole cards of the seats, when the round starts, with the number of
+inputs of the agent (begin_hand returns a handle, one per table or game in flight), receives the inputs and action
+index of every decision of the agent (add_decision) and is written with the final round state of pypokerengine's
+DataEncoder format, once the round is over (end_hand). The hands of a chunk share their number of seats and of
+inputs, a hand that changes them starts a new chunk. Cards are stored as the ids of cards.py, -1 when unknown (the
+hole cards of the opponents in evaluation games, the cards of the board that were not dealt).
+
+Every chunk holds one row per hand:
+  run, game                     run of the recorder, number of the game in the run
+  round_count, dealer_btn, agent_seat, pot
+  stacks_before, stacks_after   (nb_hands, nb_seats)
+  winnings                      (nb_hands, nb_seats)   chips won from the pot, the winners being the seats above 0
+  hole_cards                    (nb_hands, nb_seats, 2)
+  board                         (nb_hands, 5)
+and the actions and decisions of all the hands, those of hand i being rows offsets[i] to offsets[i + 1]:
+  action_offsets, action_seat, action_street, action_kind (index in ACTIONS), action_amount
+  decision_offsets, decision_inputs (nb_decisions, nb_inputs), decision_action
+
+read_hand_history yields the chunks of a directory as dicts of arrays, in the order they were written:
+`python src/hand_history.py [directory]` prints their totals.
+"""
+
+import atexit
+import glob
+import os
+import sys
+import threading
+from datetime import datetime
+from itertools import count
+
+import numpy as np
+
+from cards import CARD_IDS
+from features import pot_amount
+
+ACTIONS = ('FOLD', 'CALL', 'RAISE', 'SMALLBLIND', 'BIGBLIND', 'ANTE')
+STREETS = ('preflop', 'flop', 'turn', 'river')
+BOARD_SIZE = 5
+CHUNK_SIZE = 4096
+
+_ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+_recorder_ids = count()
+
+
+def card_ids_or_unknown(cards, size):
+    """Ids of cards (strings or pypokerengine Cards), padded with -1 up to size."""
+    ids = [CARD_IDS[str(card)] for card in cards or []]
+    return ids + [-1] * (size - len(ids))
+
+
+def paid_amounts(actions, nb_seats):
+    """
+    Chips put in the pot by each seat, from the (seat, street, kind, amount) actions of a hand: the antes, and on
+    every street the amount of the last blind, call or raise of the seat, which includes its previous bets.
+    """
+    paid = [0] * nb_seats
+    street_bets = {}
+    for seat, street, kind, amount in actions:
+        if ACTIONS[kind] == 'ANTE':
+            paid[seat] += amount
+        elif ACTIONS[kind] != 'FOLD':
+            street_bets[seat, street] = amount
+    for (seat, _), amount in street_bets.items():
+        paid[seat] += amount
+    return paid
+
+
+class _Hand:
+    def __init__(self, game, stacks, hole_cards, agent_seat, nb_inputs):
+        self.game = game
+        self.stacks = stacks
+        self.hole_cards = hole_cards
+        self.agent_seat = agent_seat
+        self.nb_inputs = nb_inputs
+        self.decision_inputs = []
+        self.decision_actions = []
+
+    def add_decision(self, inputs, action_idx):
+        self.decision_inputs.append(np.array(inputs, dtype=np.float32))
+        self.decision_actions.append(action_idx)
+
+
+class HandRecorder:
+    def __init__(self, directory, chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.run = '{0:%Y%m%d%H%M%S}-{1}-{2}'.format(datetime.now(), os.getpid(), next(_recorder_ids))
+        self.nb_chunks = 0
+        self.nb_games = 0
+        self.lock = threading.Lock()
+        self._clear()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def _clear(self):
+        self.columns = {name: [] for name in ['game', 'round_count', 'dealer_btn', 'agent_seat', 'pot',
+                                              'stacks_before', 'stacks_after', 'winnings', 'hole_cards', 'board',
+                                              'action_seat', 'action_street', 'action_kind', 'action_amount',
+                                              'decision_inputs', 'decision_action']}
+        self.action_offsets = [0]
+        self.decision_offsets = [0]
+        self.nb_seats = None
+        self.nb_inputs = None
+
+    def __len__(self):
+        return len(self.columns['game'])
+
+    def new_game(self):
+        """Number of a new game in the run, for the hands begun after it."""
+        with self.lock:
+            self.nb_games += 1
+            return self.nb_games - 1
+
+    def begin_hand(self, game, stacks, hole_cards, nb_inputs, agent_seat=-1):
+        """
+        Handle of a hand of game, from the stacks of the seats before the blinds and their hole cards, None when
+        unknown. agent_seat is the seat whose decisions, of nb_inputs inputs (the width of its featurizer), are added
+        to the hand.
+        """
+        return _Hand(game, list(stacks), [card_ids_or_unknown(cards, 2) for cards in hole_cards], agent_seat,
+                     nb_inputs)
+
+    def end_hand(self, hand, round_state):
+        """Adds hand, finished with round_state, and writes a chunk when chunk_size hands are gathered."""
+        seats = round_state['seats']
+        seat_index = {seat['uuid']: pos for pos, seat in enumerate(seats)}
+        actions = [(seat_index[action['uuid']], street, _ACTION_INDEX[action['action']], action.get('amount', 0))
+                   for street, name in enumerate(STREETS)
+                   for action in round_state['action_histories'].get(name, [])]
+        stacks_after = [seat['stack'] for seat in seats]
+        paid = paid_amounts(actions, len(seats))
+        # pypokerengine takes the stack of a seat that cannot pay the blinds without putting it in the pot
+        winnings = [max(0, after - before + paid) for before, after, paid in zip(hand.stacks, stacks_after, paid)]
+
+        with self.lock:
+            if len(self) and (self.nb_seats != len(seats) or self.nb_inputs != hand.nb_inputs):
+                self._write_chunk()
+            self.nb_seats = len(seats)
+            self.nb_inputs = hand.nb_inputs
+            columns = self.columns
+            columns['game'].append(hand.game)
+            columns['round_count'].append(round_state['round_count'])
+            columns['dealer_btn'].append(round_state['dealer_btn'])
+            columns['agent_seat'].append(hand.agent_seat)
+            columns['pot'].append(pot_amount(round_state))
+            columns['stacks_before'].append(hand.stacks)
+            columns['stacks_after'].append(stacks_after)
+            columns['winnings'].append(winnings)
+            columns['hole_cards'].append(hand.hole_cards)
+            columns['board'].append(card_ids_or_unknown(round_state['community_card'], BOARD_SIZE))
+            for seat, street, kind, amount in actions:
+                columns['action_seat'].append(seat)
+                columns['action_street'].append(street)
+                columns['action_kind'].append(kind)
+                columns['action_amount'].append(amount)
+            self.action_offsets.append(self.action_offsets[-1] + len(actions))
+            columns['decision_inputs'] += hand.decision_inputs
+            columns['decision_action'] += hand.decision_actions
+            self.decision_offsets.append(self.decision_offsets[-1] + len(hand.decision_actions))
+            if len(self) >= self.chunk_size:
+                self._write_chunk()
+
+    def flush(self):
+        with self.lock:
+            self._write_chunk()
+
+    def close(self):
+        self.flush()
+
+    def _write_chunk(self):
+        if not len(self):
+            return
+        columns = self.columns
+        chunk = {
+            'run': np.full(len(self), self.run),
+            'game': np.array(columns['game'], dtype=np.int32),
+            'round_count': np.array(columns['round_count'], dtype=np.int16),
+            'dealer_btn': np.array(columns['dealer_btn'], dtype=np.int8),
+            'agent_seat': np.array(columns['agent_seat'], dtype=np.int8),
+            'pot': np.array(columns['pot'], dtype=np.int32),
+            'stacks_before': np.array(columns['stacks_before'], dtype=np.int32),
+            'stacks_after': np.array(columns['stacks_after'], dtype=np.int32),
+            'winnings': np.array(columns['winnings'], dtype=np.int32),
+            'hole_cards': np.array(columns['hole_cards'], dtype=np.int8),
+            'board': np.array(columns['board'], dtype=np.int8),
+            'action_offsets': np.array(self.action_offsets, dtype=np.int64),
+            'action_seat': np.array(columns['action_seat'], dtype=np.int8),
+            'action_street': np.array(columns['action_street'], dtype=np.int8),
+            'action_kind': np.array(columns['action_kind'], dtype=np.int8),
+            'action_amount': np.array(columns['action_amount'], dtype=np.int32),
+            'decision_offsets': np.array(self.decision_offsets, dtype=np.int64),
+            'decision_inputs': (np.array(columns['decision_inputs'], dtype=np.float32) if columns['decision_inputs']
+                                else np.zeros((0, self.nb_inputs), dtype=np.float32)),
+            'decision_action': np.array(columns['decision_action'], dtype=np.int8),
+        }
+        path = os.path.join(self.directory, '{0}-{1:06d}.npz'.format(self.run, self.nb_chunks))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **chunk)
+        os.replace(tmp_path, path)
+        self.nb_chunks += 1
+        self._clear()
+
+
+def read_hand_history(directory):
+    """Yields every chunk of directory as a dict of arrays (see the module docstring), oldest run first."""
+    for path in sorted(glob.glob(os.path.join(directory, '*.npz'))):
+        with np.load(path) as chunk:
+            yield {name: chunk[name] for name in chunk.files}
+
+
+if __name__ == '__main__':
+    nb_chunks = nb_hands = nb_actions = nb_decisions = 0
+    for chunk in read_hand_history(sys.argv[1] if len(sys.argv) > 1 else './logs/hands'):
+        nb_chunks += 1
+        nb_hands += len(chunk['game'])
+        nb_actions += len(chunk['action_kind'])
+        nb_decisions += len(chunk['decision_action'])
+    print('{0} chunks, {1} hands, {2} actions, {3} decisions'.format(nb_chunks, nb_hands, nb_actions, nb_decisions))
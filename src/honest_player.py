@@ -5,24 +5,29 @@ link: https://github.com/ishikota/PyPokerEngine/tree/master/examples/players/hon
 
 
 from pypokerengine.players import BasePokerPlayer
-from pypokerengine.utils.card_utils import gen_cards, estimate_hole_card_win_rate
+
+from cards import card_ids
+from equity import estimate_win_rates
 
 NB_SIMULATION = 1000
 
 
 class HonestPlayer(BasePokerPlayer):
 
-    def __init__(self, nb_players):
+    def __init__(self, nb_players, equity_tolerance=None):
         self.nb_players = nb_players
+        self.equity_tolerance = equity_tolerance
 
     def declare_action(self, valid_actions, hole_card, round_state):
         community_card = round_state['community_card']
-        win_rate = estimate_hole_card_win_rate(
+        win_rates = estimate_win_rates(
                 nb_simulation=NB_SIMULATION,
                 nb_player=self.nb_players,
-                hole_card=gen_cards(hole_card),
-                community_card=gen_cards(community_card)
+                hole=card_ids(hole_card),
+                board=card_ids(community_card),
+                tolerance=self.equity_tolerance
                 )
+        win_rate = win_rates[self.nb_players - 2]
         if win_rate >= 1.0 / self.nb_players:
             action = valid_actions[1]  # fetch CALL action info
         else:
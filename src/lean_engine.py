@@ -0,0 +1,473 @@
+"""
+Lean game engine for self-play, an alternative to MyEmulator with the rule set of pypokerengine.
+
+pypokerengine deep-copies the whole game state (table, seats, players, deck) on every action, and encodes the round
+state three times per action for messages nobody reads in training. Here the game state is a LeanGameState of fixed
+size per-seat lists (stacks, paid amounts, pay status, hole cards, action histories) that actions mutate in place, and
+LeanGameState.copy is a cheap snapshot. The round state handed to players is only encoded when a player is asked to
+act and reads it (see needs_round_state in my_emulator.py), in the same format as pypokerengine's DataEncoder.
+
+LeanEmulator has the interface of MyEmulator used by Trainer (generate_initial_game_state, start_new_round,
+run_until_my_next_action, apply_my_action, _is_last_round), and game_state['table'].seats.players gives the uuid,
+stack and hole cards of every seat. The rules follow pypokerengine 1.0.1 exactly, quirks included: blinds and antes,
+players short of money excluded, illegal actions turned into folds, all-ins, side pots, the five community cards dealt
+even when everyone folded, showdowns ranked by pypokerengine's HandEvaluator, and the reward baseline of
+MyEmulator.run_until_my_next_action. tests/test_lean_engine.py plays the same seeded games on both engines and
+compares every decision, round result and stack: `python -m pytest tests/`
+
+As with MyEmulator, record_rounds keeps the round state of the last finished round in last_round_state, encoded at the
+showdown before the round is cleared.
+"""
+
+import random
+
+from pypokerengine.api.emulator import Emulator, update_blind_level
+from pypokerengine.engine.card import Card
+from pypokerengine.engine.hand_evaluator import HandEvaluator
+from pypokerengine.engine.pay_info import PayInfo
+from pypokerengine.engine.poker_constants import PokerConstants as Const
+
+PREFLOP, FLOP, TURN, RIVER, SHOWDOWN, FINISHED = range(6)
+STREET_NAMES = ['preflop', 'flop', 'turn', 'river', 'showdown']
+PAY_TILL_END, ALLIN, FOLDED = PayInfo.PAY_TILL_END, PayInfo.ALLIN, PayInfo.FOLDED
+STATUS_NAMES = {PAY_TILL_END: 'participating', ALLIN: 'allin', FOLDED: 'folded'}
+RAISE_ACTIONS = ('RAISE', 'SMALLBLIND', 'BIGBLIND')
+
+# pypokerengine card ids go from 1 to 52
+CARDS = [None] + [Card.from_id(card_id) for card_id in range(1, 53)]
+CARD_NAMES = [None] + [str(card) for card in CARDS[1:]]
+
+
+class _SeatView:
+    __slots__ = ('state', 'index')
+
+    def __init__(self, state, index):
+        self.state = state
+        self.index = index
+
+    @property
+    def uuid(self):
+        return self.state.uuids[self.index]
+
+    @property
+    def name(self):
+        return self.state.names[self.index]
+
+    @property
+    def stack(self):
+        return self.state.stacks[self.index]
+
+    @property
+    def hole_card(self):
+        return self.state.hole_card(self.index)
+
+
+class _Seats:
+    def __init__(self, players):
+        self.players = players
+
+
+class _TableView:
+    """
+    What Trainer reads of pypokerengine's Table: seats.players with their uuid, stack and hole cards, and the dealer
+    button.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.seats = _Seats([_SeatView(state, i) for i in range(len(state.uuids))])
+
+    @property
+    def dealer_btn(self):
+        return self.state.dealer_btn
+
+
+class LeanGameState:
+    def __init__(self, uuids, names, stacks, small_blind_amount):
+        nb_seats = len(uuids)
+        self.uuids = list(uuids)
+        self.names = list(names)
+        self.stacks = list(stacks)
+        self.paid = [0] * nb_seats            # paid over the round (pay_info.amount)
+        self.status = [PAY_TILL_END] * nb_seats
+        self.street_paid = [0] * nb_seats     # bet of the current street (paid_sum)
+        self.histories = [[] for _ in range(nb_seats)]
+        self.round_histories = [[None] * 4 for _ in range(nb_seats)]
+        self.holes = [[] for _ in range(nb_seats)]
+        self.community = []
+        self.deck = list(range(1, 53))
+        self.dealer_btn = nb_seats - 1
+        self.sb_pos = None
+        self.bb_pos = None
+        self.round_count = 0
+        self.small_blind_amount = small_blind_amount
+        self.street = PREFLOP
+        self.next_player = None
+        self.record_rounds = False
+        self.last_round_state = None
+        self.table = _TableView(self)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def copy(self):
+        state = LeanGameState.__new__(LeanGameState)
+        state.__dict__.update(self.__dict__)
+        for name in ['uuids', 'names', 'stacks', 'paid', 'status', 'street_paid', 'community', 'deck']:
+            setattr(state, name, list(getattr(self, name)))
+        state.histories = [list(histories) for histories in self.histories]
+        state.round_histories = [list(histories) for histories in self.round_histories]
+        state.holes = [list(hole) for hole in self.holes]
+        state.table = _TableView(state)
+        return state
+
+    def _next_pos(self, start_pos, check):
+        nb_seats = len(self.uuids)
+        for offset in range(1, nb_seats + 1):
+            pos = (start_pos + offset) % nb_seats
+            if check(pos):
+                return pos
+        return None
+
+    def next_active_player_pos(self, start_pos):
+        return self._next_pos(start_pos, lambda pos: self.status[pos] != FOLDED and self.stacks[pos] != 0)
+
+    def next_ask_waiting_player_pos(self, start_pos):
+        return self._next_pos(start_pos, lambda pos: self.status[pos] == PAY_TILL_END)
+
+    def nb_active_players(self):
+        return sum(1 for status in self.status if status != FOLDED)
+
+    def nb_ask_waiting_players(self):
+        return sum(1 for status in self.status if status == PAY_TILL_END)
+
+    def last_raise(self):
+        raises = [history for histories in self.histories for history in histories
+                  if history['action'] in RAISE_ACTIONS]
+        return max(raises, key=lambda history: history['amount']) if raises else None
+
+    def agree_amount(self):
+        last_raise = self.last_raise()
+        return last_raise['amount'] if last_raise else 0
+
+    def legal_actions(self, pos):
+        last_raise = self.last_raise()
+        min_raise = last_raise['amount'] + last_raise['add_amount'] if last_raise else self.small_blind_amount * 2
+        max_raise = self.stacks[pos] + self.street_paid[pos]
+        if max_raise < min_raise:
+            min_raise = max_raise = -1
+        return [
+            {'action': 'fold', 'amount': 0},
+            {'action': 'call', 'amount': last_raise['amount'] if last_raise else 0},
+            {'action': 'raise', 'amount': {'min': min_raise, 'max': max_raise}}
+        ]
+
+    def hole_card(self, pos):
+        return [CARD_NAMES[card] for card in self.holes[pos]]
+
+    def pots(self):
+        """Side pots of the all-in players by increasing amount, then the main pot, as pypokerengine's create_pot."""
+        pots, side_total = [], 0
+        for allin_amount in sorted(paid for paid, status in zip(self.paid, self.status) if status == ALLIN):
+            amount = sum(min(allin_amount, paid) for paid in self.paid) - side_total
+            eligibles = [pos for pos, (paid, status) in enumerate(zip(self.paid, self.status))
+                         if paid >= allin_amount and status != FOLDED]
+            pots.append((amount, eligibles))
+            side_total += amount
+        max_paid = max(self.paid)
+        pots.append((sum(self.paid) - side_total, [pos for pos, paid in enumerate(self.paid) if paid == max_paid]))
+        return pots
+
+    def round_state(self):
+        """The round state of pypokerengine's DataEncoder.encode_round_state."""
+        pots = self.pots()
+        return {
+            'street': STREET_NAMES[self.street] if self.street < FINISHED else None,
+            # as DataEncoder.encode_pot, 'main' is the first pot of the list (the smallest side pot if any)
+            'pot': {
+                'main': {'amount': pots[0][0]},
+                'side': [{'amount': amount, 'eligibles': [self.uuids[pos] for pos in eligibles]}
+                         for amount, eligibles in pots[1:]]
+            },
+            'community_card': [CARD_NAMES[card] for card in self.community],
+            'dealer_btn': self.dealer_btn,
+            # as pypokerengine's Table, once nobody is left to act (e.g. at the showdown)
+            'next_player': 'not_found' if self.next_player is None else self.next_player,
+            'small_blind_pos': self.sb_pos,
+            'big_blind_pos': self.bb_pos,
+            'round_count': self.round_count,
+            'small_blind_amount': self.small_blind_amount,
+            'seats': [{'name': name, 'uuid': uuid, 'stack': stack, 'state': STATUS_NAMES[status]}
+                      for name, uuid, stack, status in zip(self.names, self.uuids, self.stacks, self.status)],
+            'action_histories': self.action_histories()
+        }
+
+    def action_histories(self):
+        nb_seats = len(self.uuids)
+        street_histories = [[self.round_histories[pos][street] for pos in range(nb_seats)] for street in range(4)]
+        street_histories = [histories for histories in street_histories
+                            if any(history is not None for history in histories)]
+        street_histories.append(self.histories)
+        action_histories = {}
+        # as DataEncoder, the actions of the showdown street are never listed
+        for name, histories in zip(STREET_NAMES[:SHOWDOWN], street_histories):
+            ordered = [histories[(self.sb_pos + i) % nb_seats] or [] for i in range(nb_seats)]
+            action_histories[name] = [h[depth] for depth in range(max(len(h) for h in ordered))
+                                      for h in ordered if depth < len(h)]
+        return action_histories
+
+    def _add_history(self, pos, history):
+        history['uuid'] = self.uuids[pos]
+        self.histories[pos].append(history)
+
+    def _pay(self, pos, amount):
+        if self.stacks[pos] < amount:
+            raise ValueError('Failed to collect {0} chips. Because he has only {1} chips'.format(amount,
+                                                                                              self.stacks[pos]))
+        self.stacks[pos] -= amount
+        self.paid[pos] += amount
+
+    def _is_allin(self, pos, action, amount):
+        if action == 'call':
+            return amount >= self.stacks[pos] + self.street_paid[pos]
+        if action == 'raise':
+            return amount == self.stacks[pos] + self.street_paid[pos]
+        return False
+
+    def _is_illegal(self, pos, action, amount):
+        if action == 'fold':
+            return False
+        short_of_money = self.stacks[pos] < amount - self.street_paid[pos]
+        if action == 'call':
+            return short_of_money or amount != self.agree_amount()
+        if action == 'raise':
+            last_raise = self.last_raise()
+            min_raise = last_raise['amount'] + last_raise['add_amount'] if last_raise else self.small_blind_amount * 2
+            return short_of_money or min_raise > amount
+        return None
+
+    def start_round(self, round_count, small_blind_amount, ante_amount):
+        """RoundManager.start_new_round, on a state whose blind positions are set."""
+        self.round_count = round_count
+        self.small_blind_amount = small_blind_amount
+        self.street = PREFLOP
+        random.shuffle(self.deck)
+        if ante_amount != 0:
+            for pos in range(len(self.uuids)):
+                if self.status[pos] != FOLDED:
+                    self._pay(pos, ante_amount)
+                    self._add_history(pos, {'action': 'ANTE', 'amount': ante_amount})
+        for pos, action, amount in [(self.sb_pos, 'SMALLBLIND', small_blind_amount),
+                                    (self.bb_pos, 'BIGBLIND', small_blind_amount * 2)]:
+            self._pay(pos, amount)
+            self._add_history(pos, {'action': action, 'amount': amount, 'add_amount': small_blind_amount})
+            self.street_paid[pos] = amount
+        for pos in range(len(self.uuids)):
+            self.holes[pos] = [self.deck.pop(), self.deck.pop()]
+        self._start_street()
+
+    def apply_action(self, action, amount):
+        """RoundManager.apply_action, in place."""
+        pos = self.next_player
+        if self._is_allin(pos, action, amount):
+            amount = self.stacks[pos] + self.street_paid[pos]
+        elif self._is_illegal(pos, action, amount):
+            action, amount = 'fold', 0
+        if self._is_allin(pos, action, amount):
+            self.status[pos] = ALLIN
+
+        if action == 'call' or action == 'raise':
+            need_amount = amount - self.street_paid[pos]
+            agree_amount = self.agree_amount()
+            self._pay(pos, need_amount)
+            if action == 'call':
+                self._add_history(pos, {'action': 'CALL', 'amount': amount, 'paid': need_amount})
+            else:
+                self._add_history(pos, {'action': 'RAISE', 'amount': amount, 'paid': need_amount,
+                                        'add_amount': amount - agree_amount})
+            self.street_paid[pos] = amount
+        elif action == 'fold':
+            self._add_history(pos, {'action': 'FOLD'})
+            self.status[pos] = FOLDED
+        else:
+            raise ValueError('Unexpected action {0} received'.format(action))
+
+        if self._is_everyone_agreed():
+            for pos in range(len(self.uuids)):
+                self.round_histories[pos][self.street] = self.histories[pos]
+                self.histories[pos] = []
+                self.street_paid[pos] = 0
+            self.street += 1
+            self._start_street()
+        else:
+            self.next_player = self.next_ask_waiting_player_pos(self.next_player)
+
+    def _is_everyone_agreed(self):
+        if self.nb_active_players() == 0:
+            raise ValueError('[__is_everyone_agreed] no-active-players!!')
+        next_pos = self.next_ask_waiting_player_pos(self.next_player)
+        max_pay = max(self.street_paid)
+
+        def is_agreed(pos):
+            histories = self.histories[pos]
+            bb_ask_once = self.street == PREFLOP and len(histories) == 1 and histories[0]['action'] == 'BIGBLIND'
+            return (not bb_ask_once and self.street_paid[pos] == max_pay and len(histories) != 0) or \
+                self.status[pos] in (FOLDED, ALLIN)
+
+        everyone_agreed = all(is_agreed(pos) for pos in range(len(self.uuids)))
+        lonely_player = self.nb_active_players() == 1
+        no_need_to_ask = self.nb_ask_waiting_players() == 1 and next_pos is not None and \
+            self.status[next_pos] == PAY_TILL_END and self.street_paid[next_pos] == max_pay
+        return everyone_agreed or lonely_player or no_need_to_ask
+
+    def _start_street(self):
+        while True:
+            self.next_player = self.next_ask_waiting_player_pos(self.sb_pos - 1)
+            if self.street == PREFLOP:
+                for _ in range(2):
+                    self.next_player = self.next_ask_waiting_player_pos(self.next_player)
+            elif self.street == FLOP:
+                self.community += [self.deck.pop() for _ in range(3)]
+            elif self.street in (TURN, RIVER):
+                self.community.append(self.deck.pop())
+            elif self.street == SHOWDOWN:
+                self._showdown()
+                return
+            else:
+                raise ValueError('Street is already finished [street = {0}]'.format(self.street))
+            if self.nb_ask_waiting_players() > 1:
+                return
+            self.street += 1
+
+    def _showdown(self):
+        community = [CARDS[card] for card in self.community]
+        scores = {}
+        prizes = [0] * len(self.uuids)
+        for amount, eligibles in self.pots():
+            active = [pos for pos in eligibles if self.status[pos] != FOLDED]
+            for pos in active:
+                if pos not in scores:
+                    scores[pos] = HandEvaluator.eval_hand([CARDS[card] for card in self.holes[pos]], community)
+            best_score = max(scores[pos] for pos in active)
+            winners = [pos for pos in active if scores[pos] == best_score]
+            for pos in winners:
+                prizes[pos] += int(amount / len(winners))
+        for pos, prize in enumerate(prizes):
+            self.stacks[pos] += prize
+        if self.record_rounds:
+            self.last_round_state = self.round_state()
+
+        nb_seats = len(self.uuids)
+        self.deck = list(range(1, 53))
+        self.community = []
+        self.holes = [[] for _ in range(nb_seats)]
+        self.histories = [[] for _ in range(nb_seats)]
+        self.round_histories = [[None] * 4 for _ in range(nb_seats)]
+        self.paid = [0] * nb_seats
+        self.status = [PAY_TILL_END] * nb_seats
+        self.street_paid = [0] * nb_seats
+        self.street = FINISHED
+
+
+class LeanEmulator(Emulator):
+    def __init__(self):
+        super().__init__()
+        self.waiting_messages = False
+        self.start_stack = 0
+        self.record_rounds = False
+        self.last_round_state = None
+
+    def generate_initial_game_state(self, players_info):
+        uuids = list(players_info)
+        return LeanGameState(uuids, [players_info[uuid]['name'] for uuid in uuids],
+                             [players_info[uuid]['stack'] for uuid in uuids], self.game_rule['sb_amount'])
+
+    def start_new_round(self, game_state):
+        """Emulator.start_new_round, in place."""
+        round_count = game_state.round_count + 1
+        ante, sb_amount = update_blind_level(self.game_rule['ante'], self.game_rule['sb_amount'], round_count,
+                                             self.blind_structure)
+        game_state.dealer_btn = game_state.next_active_player_pos(game_state.dealer_btn)
+        self._exclude_short_of_money_players(game_state, ante, sb_amount)
+        if game_state.nb_active_players() == 1:
+            players = [{'uuid': uuid, 'stack': stack} for uuid, stack in zip(game_state.uuids, game_state.stacks)]
+            return game_state, [{'type': 'event_game_finish', 'players': players}]
+        game_state.record_rounds = self.record_rounds
+        game_state.start_round(round_count, sb_amount, ante)
+        return game_state, []
+
+    @staticmethod
+    def _exclude_short_of_money_players(state, ante, sb_amount):
+        nb_seats = len(state.uuids)
+        for pos in range(nb_seats):
+            if state.stacks[pos] < ante:
+                state.stacks[pos] = 0
+        if state.stacks[state.dealer_btn] == 0:
+            state.dealer_btn = state.next_active_player_pos(state.dealer_btn)
+
+        search_targets = [(state.dealer_btn + 1 + i) % nb_seats for i in range(nb_seats)]
+        sb_relative_pos = next(i for i, pos in enumerate(search_targets) if state.stacks[pos] >= sb_amount + ante)
+        sb_pos = search_targets[sb_relative_pos]
+        for pos in search_targets[:sb_relative_pos]:
+            state.stacks[pos] = 0
+        search_targets = [(sb_pos + 1 + i) % nb_seats for i in range(nb_seats - 1)]
+        bb_relative_pos = next((i for i, pos in enumerate(search_targets) if state.stacks[pos] >= sb_amount * 2 + ante),
+                               None)
+        if bb_relative_pos is None:
+            bb_pos = sb_pos
+            for pos in range(nb_seats):
+                if pos != sb_pos:
+                    state.stacks[pos] = 0
+        else:
+            bb_pos = search_targets[bb_relative_pos]
+            for pos in search_targets[:bb_relative_pos]:
+                state.stacks[pos] = 0
+
+        for pos in range(nb_seats):
+            if state.stacks[pos] == 0:
+                state.status[pos] = FOLDED
+        state.sb_pos, state.bb_pos = sb_pos, bb_pos
+        if state.stacks[state.dealer_btn] == 0:
+            state.dealer_btn = state.next_active_player_pos(state.dealer_btn)
+
+    def run_until_my_next_action(self, game_state, my_uuid, my_messages):
+        """
+        MyEmulator.run_until_my_next_action: the reward of a finished round is measured from the stack the player had
+        when the round started, or when it last acted if no other player acted before it in the round.
+        """
+        my_pos = game_state.uuids.index(my_uuid)
+        if not self.waiting_messages:
+            self.start_stack = game_state.stacks[my_pos]
+
+        actual_street = game_state.street
+        while game_state.street != FINISHED:
+            pos = game_state.next_player
+            player = self.fetch_player(game_state.uuids[pos])
+            valid_actions = game_state.legal_actions(pos)
+            hole_card = round_state = None
+            if pos == my_pos or actual_street != game_state.street or getattr(player, 'needs_round_state', True):
+                hole_card = game_state.hole_card(pos)
+                round_state = game_state.round_state()
+            if actual_street != game_state.street:
+                self.fetch_player(my_uuid).update_agressivity(round_state, actual_street)
+                actual_street = game_state.street
+            if pos == my_pos:
+                return game_state, valid_actions, hole_card, round_state
+
+            action, amount = player.declare_action(valid_actions, hole_card, round_state)
+            game_state.apply_action(action, amount)
+            self.waiting_messages = True
+        self.waiting_messages = False
+        self.last_round_state = game_state.last_round_state
+        return game_state, game_state.stacks[my_pos] - self.start_stack
+
+    def apply_my_action(self, game_state, action, bet_amount=0):
+        game_state.apply_action(action, bet_amount)
+        return game_state, []
+
+    def _is_last_round(self, game_state, game_rule):
+        is_round_finished = game_state['street'] == Const.Street.FINISHED
+        is_final_round = game_state['round_count'] == game_rule['max_round']
+        is_winner_decided = len([1 for p in game_state['table'].seats.players if p.stack != 0]) == 1
+        return is_round_finished and (is_final_round or is_winner_decided)
+
@@ -0,0 +1,121 @@
+"""
+Registry of the saved models of a directory (models/ or the training logs/), indexed by version and step.
+
+The registry is a registry.json manifest at the root of the directory. Every entry holds the version, the training
+step, an optional score, the path of the TF checkpoint and the path and layer shapes of its flat .npy weights (see
+numpy_backend.py). Looking a model up only reads the manifest: the directory is never scanned and no checkpoint
+metadata is parsed. The manifest of an existing directory can be (re)built by scanning it once:
+`python src/model_registry.py [directory]`
+
+register adds a checkpoint and exports its weights. prune applies the retention policy: the keep_latest most recent
+steps of a version and its best scored one are kept, the files of the others are deleted. Steps only grow within a
+directory: a training run numbers its checkpoints from next_step, so that they sort after those of the earlier runs.
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+
+from numpy_backend import export_weights, load_weights
+
+MANIFEST = 'registry.json'
+KEEP_LATEST = 5
+
+_CHECKPOINT_NAME = re.compile(r'model(?:_v(\d+))?-(\d+)\.ckpt$')
+_CHECKPOINT_SUFFIXES = ['.index', '.meta', '.data-00000-of-00001']
+
+
+class ModelRegistry:
+    def __init__(self, directory='./models'):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST)
+        self.models = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.models = json.load(f)['models']
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('{"models": [\n' + ',\n'.join(json.dumps(model) for model in self.models) + '\n]}\n')
+        os.replace(tmp_path, self.path)
+
+    def entries(self, version):
+        return sorted([model for model in self.models if model['version'] == str(version)], key=lambda m: m['step'])
+
+    def latest(self, version):
+        entries = self.entries(version)
+        return entries[-1] if entries else None
+
+    def next_step(self, version):
+        """Step following the latest one of version, 0 for a new version."""
+        latest = self.latest(version)
+        return latest['step'] + 1 if latest else 0
+
+    def best(self, version):
+        """Entry with the highest score, the latest one when no entry of the version has a score."""
+        scored = [model for model in self.entries(version) if model.get('score') is not None]
+        if not scored:
+            return self.latest(version)
+        return max(scored, key=lambda m: (m['score'], m['step']))
+
+    def lookup(self, version, which='best'):
+        """which is 'best', 'latest' or a step number."""
+        if which == 'best':
+            return self.best(version)
+        if which == 'latest':
+            return self.latest(version)
+        for model in self.entries(version):
+            if model['step'] == int(which):
+                return model
+        return None
+
+    def register(self, version, step, checkpoint_path, score=None):
+        weights_path, shapes = export_weights(checkpoint_path)
+        model = {'version': str(version), 'step': int(step), 'score': score,
+                 'checkpoint': checkpoint_path, 'weights': weights_path, 'shapes': shapes}
+        self.models = [m for m in self.models if (m['version'], m['step']) != (model['version'], model['step'])]
+        self.models.append(model)
+        self.save()
+        return model
+
+    def prune(self, version, keep_latest=KEEP_LATEST):
+        entries = self.entries(version)
+        kept = entries[-keep_latest:] if keep_latest > 0 else []
+        best = self.best(version)
+        removed = [model for model in entries if model not in kept and model is not best]
+        for model in removed:
+            for path in [model['weights']] + [model['checkpoint'] + suffix for suffix in _CHECKPOINT_SUFFIXES]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.models.remove(model)
+        if removed:
+            self.save()
+        return removed
+
+    @staticmethod
+    def load_weights(model):
+        return load_weights(model['weights'], model['shapes'])
+
+
+def scan(directory):
+    """Registers every checkpoint found in directory and in its v* subdirectories."""
+    registry = ModelRegistry(directory)
+    index_paths = glob.glob(os.path.join(directory, '*.ckpt.index')) + \
+        glob.glob(os.path.join(directory, 'v*', '*.ckpt.index'))
+    for index_path in sorted(index_paths):
+        checkpoint_path = os.path.normpath(index_path[:-len('.index')])
+        match = _CHECKPOINT_NAME.search(checkpoint_path)
+        if not match:
+            continue
+        version = match.group(1) or re.search(r'v(\d+)$', os.path.dirname(checkpoint_path)).group(1)
+        registry.register(version, int(match.group(2)), checkpoint_path)
+        print('registered v{0} step {1}: {2}'.format(version, match.group(2), checkpoint_path))
+    return registry
+
+
+if __name__ == '__main__':
+    scan(sys.argv[1] if len(sys.argv) > 1 else './models')
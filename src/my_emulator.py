@@ -5,12 +5,22 @@ link: https://github.com/EvgenyKashin/TensorPoker/blob/master/scripts/MyEmulator
 
 This code is not relevant for my AI. The main utility is to make the game run until my player has an action to do.
 It should be included in the native Emulator of PyPokerEngine but it's not the case, so someone fixed it.
+
+Opponents with a needs_round_state attribute set to False only read valid_actions: they are asked with a hole_card
+and a round_state of None, which saves encoding the round state for each of their actions.
+
+With record_rounds set, last_round_state keeps the round state of the round_result message of the last finished round
+(community cards, action histories and stacks after the pot is paid), since the table is reset when the round ends.
 """
 
 from pypokerengine.api.emulator import Emulator, RoundManager, MessageBuilder, Const, DataEncoder
+from pypokerengine.engine.action_checker import ActionChecker
 
 
 class MyEmulator(Emulator):
+    record_rounds = False
+    last_round_state = None
+
     def run_until_my_next_action(self, game_state, my_uuid, my_messages):
         try:
             _ = self.mailbox
@@ -30,7 +40,13 @@ class MyEmulator(Emulator):
             next_player_pos = game_state["next_player"]
             next_player_uuid = game_state["table"].seats.players[next_player_pos].uuid
             next_player_algorithm = self.fetch_player(next_player_uuid)
-            msg = MessageBuilder.build_ask_message(next_player_pos, game_state)["message"]
+            if next_player_uuid == my_uuid or actual_street != game_state['street'] or \
+                    getattr(next_player_algorithm, 'needs_round_state', True):
+                msg = MessageBuilder.build_ask_message(next_player_pos, game_state)["message"]
+            else:
+                valid_actions = ActionChecker.legal_actions(game_state["table"].seats.players, next_player_pos,
+                                                            game_state["small_blind_amount"])
+                msg = {"valid_actions": valid_actions, "hole_card": None, "round_state": None}
             if actual_street != game_state['street']:
                 self.fetch_player(my_uuid).update_agressivity(msg['round_state'], actual_street)
                 actual_street = game_state['street']
@@ -42,6 +58,7 @@ class MyEmulator(Emulator):
 
             game_state, messages = RoundManager.apply_action(game_state, action, amount)
             self.mailbox += messages
+            self._keep_round_state(messages)
         events = [self.create_event(message[1]["message"]) for message in self.mailbox]
         events = [e for e in events if e]
         self.mailbox = []
@@ -57,4 +74,20 @@ class MyEmulator(Emulator):
 
     def apply_my_action(self, game_state, action, bet_amount=0):
         updated_state, messages = RoundManager.apply_action(game_state, action, bet_amount)
-        return updated_state, messages
\ No newline at end of file
+        self._keep_round_state(messages)
+        return updated_state, messages
+
+    def start_new_round(self, game_state):
+        game_state, events = super().start_new_round(game_state)
+        if self.record_rounds:
+            # the round is played out right away when the blinds put every player all-in
+            for event in events:
+                if event['type'] == 'event_round_finish':
+                    self.last_round_state = event['round_state']
+        return game_state, events
+
+    def _keep_round_state(self, messages):
+        if self.record_rounds:
+            for _, message in messages:
+                if message['message']['message_type'] == MessageBuilder.ROUND_RESULT_MESSAGE:
+                    self.last_round_state = message['message']['round_state']
\ No newline at end of file
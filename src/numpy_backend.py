@@ -0,0 +1,149 @@
+"""
+TensorFlow-free inference for the trained DQN players.
+
+The deployed networks are a stack of dense layers (ReLU on every hidden layer, linear output), so a decision is a
+few small matrix products. export_weights pulls the layers of the main network out of a checkpoint and stores them
+in a flat .npy file next to it (model_v6-4800.ckpt -> model_v6-4800.npy), opened with mmap_mode='r' by
+load_weights. A DQNPlayer built with those weights plays with predict instead of a session.run, and never touches
+TensorFlow. The layer shapes are kept in the manifest of model_registry.py.
+
+Checkpoints are read without TensorFlow too: the .index file of a V2 checkpoint is a leveldb table that maps every
+variable name to its dtype, shape and position in the .data file. Only what the savers of this project write is
+supported: a single uncompressed data shard.
+"""
+
+import re
+import struct
+
+import numpy as np
+
+_DTYPES = {1: np.float32, 2: np.float64, 3: np.int32, 9: np.int64}
+_LAYER_NAME = re.compile(r'^dense(?:_(\d+))?/(kernel|bias)$')
+
+
+def _varint(buffer, pos):
+    result = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _block_entries(buffer, offset, size):
+    block = buffer[offset:offset + size]
+    nb_restarts = struct.unpack('<I', block[-4:])[0]
+    end = len(block) - 4 - 4 * nb_restarts
+    pos, key = 0, b''
+    while pos < end:
+        shared, pos = _varint(block, pos)
+        non_shared, pos = _varint(block, pos)
+        value_size, pos = _varint(block, pos)
+        key = key[:shared] + block[pos:pos + non_shared]
+        pos += non_shared
+        yield key, block[pos:pos + value_size]
+        pos += value_size
+
+
+def _parse_message(buffer):
+    fields = {}
+    pos = 0
+    while pos < len(buffer):
+        tag, pos = _varint(buffer, pos)
+        number, wire_type = tag >> 3, tag & 7
+        if wire_type == 0:
+            value, pos = _varint(buffer, pos)
+        elif wire_type == 2:
+            size, pos = _varint(buffer, pos)
+            value, pos = buffer[pos:pos + size], pos + size
+        elif wire_type == 5:
+            value, pos = buffer[pos:pos + 4], pos + 4
+        elif wire_type == 1:
+            value, pos = buffer[pos:pos + 8], pos + 8
+        else:
+            raise ValueError('unsupported protobuf wire type {0}'.format(wire_type))
+        fields.setdefault(number, []).append(value)
+    return fields
+
+
+def _shape(shape_proto):
+    dims = _parse_message(shape_proto).get(2, [])
+    return tuple(_parse_message(dim).get(1, [0])[0] for dim in dims)
+
+
+def read_checkpoint(path):
+    """All the tensors of the checkpoint path (without the .index suffix), by variable name."""
+    with open(path + '.index', 'rb') as f:
+        index = f.read()
+    with open(path + '.data-00000-of-00001', 'rb') as f:
+        data = f.read()
+
+    footer = index[-48:]
+    _, pos = _varint(footer, 0)
+    _, pos = _varint(footer, pos)
+    index_offset, pos = _varint(footer, pos)
+    index_size, _ = _varint(footer, pos)
+
+    tensors = {}
+    for _, handle in _block_entries(index, index_offset, index_size):
+        block_offset, pos = _varint(handle, 0)
+        block_size, _ = _varint(handle, pos)
+        for key, value in _block_entries(index, block_offset, block_size):
+            if not key:
+                continue
+            entry = _parse_message(value)
+            dtype = _DTYPES[entry.get(1, [1])[0]]
+            shape = _shape(entry[2][0]) if 2 in entry else ()
+            offset = entry.get(4, [0])[0]
+            size = entry.get(5, [0])[0]
+            tensors[key.decode()] = np.frombuffer(data[offset:offset + size], dtype=dtype).reshape(shape).copy()
+    return tensors
+
+
+def main_network_layers(tensors):
+    """
+    (kernel, bias) of the main network. The training graph holds the main network then the target network, so the
+    main network is the first half of the dense layers.
+    """
+    layers = {}
+    for name, tensor in tensors.items():
+        match = _LAYER_NAME.match(name)
+        if match:
+            layers.setdefault(int(match.group(1) or 0), {})[match.group(2)] = tensor
+    layers = [(layers[i]['kernel'], layers[i]['bias']) for i in sorted(layers)]
+    return layers[:len(layers) // 2]
+
+
+def export_weights(checkpoint_path, path=None):
+    """
+    Writes the layers of the main network as one flat float32 .npy file, and returns its path and the (kernel shape,
+    bias shape) of every layer, needed to split it again.
+    """
+    path = path or re.sub(r'\.ckpt$', '', checkpoint_path) + '.npy'
+    layers = main_network_layers(read_checkpoint(checkpoint_path))
+    np.save(path, np.concatenate([array.astype(np.float32).ravel() for layer in layers for array in layer]))
+    return path, [[list(kernel.shape), list(bias.shape)] for kernel, bias in layers]
+
+
+def load_weights(path, shapes):
+    """Layers of a flat .npy file written by export_weights, as views on the memory-mapped file."""
+    flat = np.load(path, mmap_mode='r')
+    weights, start = [], 0
+    for kernel_shape, bias_shape in shapes:
+        kernel_size, bias_size = int(np.prod(kernel_shape)), int(np.prod(bias_shape))
+        kernel = flat[start:start + kernel_size].reshape(kernel_shape)
+        bias = flat[start + kernel_size:start + kernel_size + bias_size].reshape(bias_shape)
+        weights.append((kernel, bias))
+        start += kernel_size + bias_size
+    return weights
+
+
+def predict(weights, inputs):
+    """Index of the best action for every row of inputs, as tf.argmax(output_layer, 1) of the DQN players."""
+    values = np.asarray(inputs, dtype=np.float32)
+    for kernel, bias in weights[:-1]:
+        values = np.maximum(values @ kernel + bias, 0)
+    kernel, bias = weights[-1]
+    return np.argmax(values @ kernel + bias, axis=1)
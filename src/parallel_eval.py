@@ -0,0 +1,53 @@
+"""
+Parallel evaluation of a trained model: the games of bin/main.py test_ai are spread over a process pool.
+
+Every worker builds its own Trainer and restores the model once, when the pool starts, then plays the games it is
+given. Game i of a batch is played with the seed seed + i, whichever worker plays it, and the results are merged back
+in game order. A hit of the equity cache skips Monte Carlo draws, so the workers do not load the cache file and clear
+their cache before every game: the random numbers a game draws only depend on its seed, and a run can be replayed
+with any number of workers. The phase timers of every game are sent back with its result and written by the parent,
+one summary per game. The pool uses the spawn start method, so that no TensorFlow state is inherited from the
+parent process.
+"""
+
+from multiprocessing import get_context
+
+from equity_cache import equity_cache
+from phase_timers import phase_timers
+from Trainer import Trainer
+
+_trainer = None
+_main_qn = None
+
+
+def _init_worker(trainer_kwargs, ai_version):
+    global _trainer, _main_qn
+    _trainer = Trainer(**dict(trainer_kwargs, equity_cache_path=None))
+    _main_qn = _trainer.get_real_game_player(ai_version)
+
+
+def _play_game(args):
+    players, seed = args
+    equity_cache.clear()
+    game_result = _trainer.play_real_game(_main_qn, players, seed=seed)
+    return game_result['players'], phase_timers.collect()
+
+
+def make_pool(trainer_kwargs, ai_version, nb_workers, events=None):
+    """Pool of nb_workers processes, whose events go to the EventLog events of the parent when given."""
+    context = get_context('spawn')
+    if events is not None:
+        trainer_kwargs = dict(trainer_kwargs, log_queue=events.process_queue(context))
+    return context.Pool(nb_workers, initializer=_init_worker, initargs=(trainer_kwargs, ai_version))
+
+
+def play_games(pool, players, nb_games, seed=0, summary_writer=None, step=0):
+    """
+    Plays nb_games games on the pool and yields the final 'players' list of every game result, in order. The phase
+    timers of game i are added to those of this process and written at step + i of summary_writer.
+    """
+    results = pool.imap(_play_game, [(players, seed + i) for i in range(nb_games)])
+    for i, (final_players, timers) in enumerate(results):
+        phase_timers.merge(timers)
+        phase_timers.write_summary(summary_writer, step + i)
+        yield final_players
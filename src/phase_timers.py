@@ -0,0 +1,93 @@
+"""
+Process-wide wall-clock timers and counters of the hot phases of training and evaluation games.
+
+A phase is timed with `with phase_timers.time('equity'):` and an event is counted with phase_timers.count(name). Both
+only add to totals under a lock, so they stay on in every run and can be shared by games running in several threads.
+write_summary sends the totals gathered since its previous call to a TensorBoard writer (the summary_writer of a
+DQNPlayer, under ./stats/) and starts new ones, so every point of the curves covers one episode:
+  time/<phase>   seconds spent in the phase
+  calls/<phase>  number of times the phase ran
+  count/<name>   counted events
+
+Phases: equity and inference of the DQN players, emulator (the training games, other players included), game (whole
+evaluation games, equity and inference included), replay_sample, train_step, target_update and checkpoint. The totals
+of another process are added with merge(collect()).
+"""
+
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+
+class _Phase:
+    __slots__ = ('timers', 'name', 'start')
+
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timers.add(self.name, perf_counter() - self.start)
+
+
+class PhaseTimers:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def time(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.seconds[name] += seconds
+            self.calls[name] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def collect(self):
+        """Totals since the previous collect, by tag."""
+        with self.lock:
+            values = {}
+            for name, seconds in self.seconds.items():
+                values['time/' + name] = seconds
+                values['calls/' + name] = self.calls[name]
+            for name, n in self.counters.items():
+                values['count/' + name] = n
+            self.seconds.clear()
+            self.calls.clear()
+            self.counters.clear()
+        return values
+
+    def merge(self, values):
+        """Adds totals returned by collect, e.g. by another process."""
+        totals = {'time': self.seconds, 'calls': self.calls, 'count': self.counters}
+        with self.lock:
+            for tag, value in values.items():
+                kind, name = tag.split('/', 1)
+                totals[kind][name] += value
+
+    def write_summary(self, writer, step):
+        """Writes the totals since the previous call at step of writer, which may be None, and returns them."""
+        values = self.collect()
+        if writer is not None and values:
+            writer.add_summary(tf.Summary(value=[tf.Summary.Value(tag=tag, simple_value=value)
+                                                 for tag, value in sorted(values.items())]), step)
+        return values
+
+
+phase_timers = PhaseTimers()
@@ -0,0 +1,82 @@
+"""
+Precomputed preflop win rates for the 169 canonical starting hands, from 2 to 10 players.
+
+The table is a (13, 13, 9) float32 array stored in data/preflop_equity.npy. Suited hands are stored above the
+diagonal (row = highest rank), offsuit hands below it and pairs on the diagonal. The last axis is the number of
+players at the table minus 2. Missing entries are NaN and are simulated live by equity.estimate_win_rate.
+data/preflop_simulations.npy holds the number of simulations of every entry, from which equity.py reports the
+error of the table, and without which the table is not used.
+
+To rebuild the table, run this from the root of the repository: `python src/preflop_table.py [nb_simulation]`
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from cards import RANKS, card_ids, card_rank, card_suit
+
+MIN_PLAYERS = 2
+MAX_PLAYERS = 10
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'preflop_equity.npy')
+NB_SIMULATION_PATH = os.path.join(os.path.dirname(TABLE_PATH), 'preflop_simulations.npy')
+
+
+def hand_index(hole):
+    first, second = card_rank(int(hole[0])), card_rank(int(hole[1]))
+    high, low = max(first, second), min(first, second)
+    if card_suit(int(hole[0])) == card_suit(int(hole[1])):
+        return high, low
+    return low, high
+
+
+def load_table(path=TABLE_PATH):
+    if not os.path.exists(path):
+        return None
+    return np.load(path)
+
+
+def load_nb_simulation(path=NB_SIMULATION_PATH):
+    if not os.path.exists(path):
+        return None
+    return int(np.load(path))
+
+
+_table = load_table()
+_nb_simulation = load_nb_simulation()
+
+
+def table_nb_simulation():
+    """Number of simulations of every entry of the table."""
+    return _nb_simulation
+
+
+def lookup_win_rate(hole, nb_player):
+    if _table is None or _nb_simulation is None or not MIN_PLAYERS <= nb_player <= MAX_PLAYERS:
+        return None
+    row, col = hand_index(hole)
+    win_rate = _table[row, col, nb_player - MIN_PLAYERS]
+    return None if np.isnan(win_rate) else float(win_rate)
+
+
+def build_table(nb_simulation=10000, path=TABLE_PATH, nb_simulation_path=NB_SIMULATION_PATH):
+    from equity import monte_carlo_win_rate
+
+    table = np.full((len(RANKS), len(RANKS), MAX_PLAYERS - MIN_PLAYERS + 1), np.nan, dtype=np.float32)
+    for row in range(len(RANKS)):
+        for col in range(len(RANKS)):
+            second_suit = 'S' if row > col else 'H'
+            hole_card = ['S' + RANKS[max(row, col)], second_suit + RANKS[min(row, col)]]
+            for nb_player in range(MIN_PLAYERS, MAX_PLAYERS + 1):
+                table[row, col, nb_player - MIN_PLAYERS] = \
+                    monte_carlo_win_rate(nb_simulation, nb_player, card_ids(hole_card), [])
+            print('built row {0} col {1}: {2}'.format(row, col, hole_card))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, table)
+    np.save(nb_simulation_path, nb_simulation)
+    return table
+
+
+if __name__ == '__main__':
+    build_table(nb_simulation=int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
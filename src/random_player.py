@@ -8,6 +8,8 @@ import random as rand
 
 
 class RandomPlayer(BasePokerPlayer):
+    needs_round_state = False
+
     def __init__(self):
         self.fold_ratio, self.call_ratio, raise_ratio = 1.0/5, 3.0/5, 1.0/5
 
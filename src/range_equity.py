@@ -0,0 +1,90 @@
+"""
+Equity against weighted opponent ranges.
+
+A range is a weight for each of the 1326 starting hands (in the order of flop_table.HOLES). For a board, a set of
+runouts is enumerated (turn, river) or sampled (preflop, flop) once, and every starting hand is scored on every
+runout with hand_evaluator.evaluate_pairs. The resulting (runouts, 1326) score matrix is cached per board, so that
+every player at the table and every decision of the street share it. The equity of a hand is then a few matrix
+operations over it:
+    - win probability against one opponent on each runout: weighted share of the possible hands it beats
+    - against n opponents holding the same range: mean over the runouts of that probability to the power n
+The opponents are drawn independently, ignoring the cards they remove from each other.
+"""
+
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+
+from cards import card_mask, remaining_deck
+from equity_cache import EquityCache
+from flop_table import HOLES, colex
+from hand_evaluator import evaluate_pairs
+from preflop_table import hand_index, load_table
+
+NB_RUNOUTS = 128
+RANGE_TIGHTNESS = 2.0
+
+_HOLE_BITS = (np.left_shift(1, HOLES[:, 0]) | np.left_shift(1, HOLES[:, 1])).astype(np.uint64)
+_board_scores = EquityCache(max_size=64)
+
+
+def _runouts(board, nb_runouts):
+    deck = remaining_deck(board)
+    nb_missing = 5 - len(board)
+    if factorial(len(deck)) // (factorial(nb_missing) * factorial(len(deck) - nb_missing)) <= nb_runouts:
+        runouts = list(combinations(deck, nb_missing))
+        runouts = np.array(runouts, dtype=np.int64).reshape(len(runouts), nb_missing)
+    else:
+        order = np.argsort(np.random.random_sample((nb_runouts, len(deck))), axis=1)
+        runouts = deck[order[:, :nb_missing]]
+    return np.hstack([np.broadcast_to(board, (len(runouts), len(board))), runouts])
+
+
+def board_scores(board, nb_runouts=NB_RUNOUTS):
+    """Runouts of board, their card masks and the (runouts, 1326) scores of every starting hand, cached by board."""
+    key = tuple(sorted(int(card) for card in board))
+    entry = _board_scores.get(key)
+    if entry is None:
+        boards = _runouts(np.asarray(key, dtype=np.int64), nb_runouts)
+        masks = np.array([card_mask(cards) for cards in boards], dtype=np.uint64)
+        entry = boards, masks, evaluate_pairs(boards, HOLES)
+        _board_scores.put(key, entry)
+    return entry
+
+
+def _strength_percentiles():
+    # heads-up preflop win rate of each starting hand, as its percentile among the 1326 hands
+    table = load_table()
+    if table is None:
+        return np.linspace(0, 1, len(HOLES))
+    win_rates = np.array([table[hand_index(hole) + (0,)] for hole in HOLES])
+    return np.argsort(np.argsort(win_rates, kind='mergesort')) / (len(HOLES) - 1)
+
+
+_STRENGTH = _strength_percentiles()
+
+
+def aggression_weights(agressivity, tightness=RANGE_TIGHTNESS):
+    """
+    Range of an opponent whose bets average agressivity times the call amount (see DQNPlayer.update_agressivity):
+    the weight of a hand is its preflop strength percentile to the power tightness * agressivity, so passive
+    opponents keep a nearly uniform range and aggressive ones are narrowed to strong hands.
+    """
+    return _STRENGTH ** (tightness * max(agressivity, 0))
+
+
+def range_win_rate(hole, board, weights, nb_opponents=1, nb_runouts=NB_RUNOUTS):
+    """Win rate of hole against nb_opponents hands drawn from the range weights (1326 weights, see HOLES)."""
+    hole = np.asarray(hole, dtype=np.int64)
+    boards, masks, scores = board_scores(board, nb_runouts)
+    hole_bits = np.uint64(card_mask(hole))
+    runouts = (masks & hole_bits) == 0
+    hole_index = int(colex(np.sort(hole)))
+
+    masks, scores = masks[runouts], scores[runouts]
+    possible = ((_HOLE_BITS[None, :] & (masks[:, None] | hole_bits)) == 0) * weights
+    total = possible.sum(axis=1)
+    wins = ((scores[:, hole_index, None] >= scores) * possible).sum(axis=1)
+    win_rates = np.divide(wins, total, out=np.ones_like(wins, dtype=np.float64), where=total > 0)
+    return float(np.mean(win_rates ** nb_opponents))
@@ -0,0 +1,189 @@
+"""
+Fixed-capacity replay memory for the DQN training loop.
+
+Transitions are stored in preallocated typed arrays (state and next state as float32 rows, action, reward, done),
+written in a ring: add is O(1) and overwrites the oldest transition once the buffer is full. sample gathers a batch
+with one fancy-indexing per array, so it returns contiguous arrays that can be fed to the network directly.
+
+PrioritizedReplayBuffer samples the transitions in proportion to their last TD error instead, through a SumTree of
+the priorities, and returns the importance-sampling weights that DQNPlayerV6 applies to its loss.
+
+MemmapReplayBuffer keeps the same arrays in .npy files of a directory, opened as memory maps, with the ring position
+and size in a replay.json manifest written by flush. It can hold tens of millions of transitions without keeping them
+resident, and a later run reopening the directory resumes from the transitions of the last flush.
+"""
+
+import json
+import os
+import random
+
+import numpy as np
+
+
+class ReplayBuffer:
+    def __init__(self, nb_inputs, capacity=50000):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, nb_inputs), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, nb_inputs), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, transitions):
+        """Writes the transitions as one chunk and returns the positions they were written at."""
+        transitions = list(transitions)[-self.capacity:]
+        indices = (self.position + np.arange(len(transitions))) % self.capacity
+        if transitions:
+            states, actions, rewards, next_states, dones = zip(*transitions)
+            self.states[indices] = states
+            self.actions[indices] = actions
+            self.rewards[indices] = rewards
+            self.next_states[indices] = next_states
+            self.dones[indices] = dones
+            self.position = int(indices[-1] + 1) % self.capacity
+            self.size = min(self.size + len(transitions), self.capacity)
+        return indices
+
+    def sample(self, batch_size):
+        """(states, actions, rewards, next_states, dones) of batch_size distinct transitions."""
+        indices = np.array(random.sample(range(self.size), batch_size))
+        return (self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices],
+                self.dones[indices])
+
+
+class SumTree:
+    """
+    Binary tree over capacity leaves where every node holds the sum of its children, stored in one array (root at
+    0, leaves from capacity - 1, capacity rounded up to a power of 2). Updating leaves and finding the leaf where a
+    prefix sum falls are O(log n), and both are vectorized over a batch of leaves.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.nodes = np.zeros(2 * self.capacity - 1, dtype=np.float64)
+
+    def total(self):
+        return self.nodes[0]
+
+    def update(self, leaves, values):
+        nodes = np.asarray(leaves) + self.capacity - 1
+        self.nodes[nodes] = values
+        while nodes[0] > 0:
+            nodes = np.unique((nodes - 1) // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes + 1] + self.nodes[2 * nodes + 2]
+
+    def find(self, prefix_sums):
+        nodes = np.zeros(len(prefix_sums), dtype=np.int64)
+        prefix_sums = np.array(prefix_sums, dtype=np.float64)
+        while nodes[0] < self.capacity - 1:
+            left = 2 * nodes + 1
+            go_right = prefix_sums >= self.nodes[left]
+            prefix_sums = np.where(go_right, prefix_sums - self.nodes[left], prefix_sums)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - (self.capacity - 1)
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay memory sampling transitions with probability priority ** alpha, where the priority is the last absolute
+    TD error of the transition (new transitions get the highest priority seen so far). sample also returns the
+    importance-sampling weights (N * P(i)) ** -beta, normalized by their maximum, that correct the loss for it.
+    """
+
+    def __init__(self, nb_inputs, capacity=50000, alpha=0.6, epsilon=1e-6):
+        super().__init__(nb_inputs, capacity)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done):
+        self.tree.update([self.position], [self.max_priority ** self.alpha])
+        super().add(state, action, reward, next_state, done)
+
+    def extend(self, transitions):
+        indices = super().extend(transitions)
+        if len(indices):
+            self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+
+    def sample(self, batch_size, beta=0.4):
+        """(states, actions, rewards, next_states, dones, indices, weights) of batch_size transitions."""
+        total = self.tree.total()
+        segments = (np.arange(batch_size) + np.random.random_sample(batch_size)) * (total / batch_size)
+        indices = np.minimum(self.tree.find(segments), self.size - 1)
+        probabilities = self.tree.nodes[indices + self.tree.capacity - 1] / total
+        weights = (self.size * probabilities) ** -beta
+        weights = (weights / weights.max()).astype(np.float32)
+        return (self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices],
+                self.dones[indices], indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+
+class MemmapReplayBuffer(ReplayBuffer):
+    MANIFEST = 'replay.json'
+
+    def __init__(self, directory, nb_inputs, capacity=10000000):
+        """Opens the store of directory, or creates it with capacity transitions when the directory holds none."""
+        self.directory = directory
+        self.path = os.path.join(directory, self.MANIFEST)
+        self.position = 0
+        self.size = 0
+        mode = 'w+'
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                manifest = json.load(f)
+            if manifest['nb_inputs'] != nb_inputs:
+                raise ValueError('replay store {0} holds {1} inputs per state, not {2}'.format(
+                    directory, manifest['nb_inputs'], nb_inputs))
+            capacity, self.position, self.size = manifest['capacity'], manifest['position'], manifest['size']
+            mode = 'r+'
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.nb_inputs = nb_inputs
+        self.states = self._open('states', mode, (capacity, nb_inputs), np.float32)
+        self.actions = self._open('actions', mode, (capacity,), np.int32)
+        self.rewards = self._open('rewards', mode, (capacity,), np.float32)
+        self.next_states = self._open('next_states', mode, (capacity, nb_inputs), np.float32)
+        self.dones = self._open('dones', mode, (capacity,), np.float32)
+        if mode == 'w+':
+            self.flush()
+
+    def _open(self, name, mode, shape, dtype):
+        return np.lib.format.open_memmap(os.path.join(self.directory, name + '.npy'), mode=mode, dtype=dtype,
+                                         shape=shape)
+
+    def sample(self, batch_size):
+        """As ReplayBuffer.sample, with the rows read in file order."""
+        indices = np.sort(random.sample(range(self.size), batch_size))
+        return (self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices],
+                self.dones[indices])
+
+    def flush(self):
+        """Writes the arrays to disk, then the manifest, so that a reopened store resumes from this point."""
+        for array in [self.states, self.actions, self.rewards, self.next_states, self.dones]:
+            array.flush()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'nb_inputs': self.nb_inputs, 'capacity': self.capacity, 'position': self.position,
+                       'size': self.size}, f)
+        os.replace(tmp_path, self.path)
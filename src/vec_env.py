@@ -0,0 +1,106 @@
+"""
+Vectorized training environment: nb_envs independent games of the training players of Trainer, stepped in lockstep.
+
+Every game has its own emulator (Trainer.new_emulator) and its own copy of the DQN player, which computes the inputs
+of the game and keeps its per-game state (stacks, aggressiveness). reset and step return the inputs of every game as
+one (nb_envs, nb_inputs) float32 matrix, whose rows are filled in place by the featurizers of the players, so the
+actions of all the games are chosen with a single batched forward pass, and step takes one action index per game.
+Between an action and the next decision of the same game, the game runs the other players and finishes rounds: the
+shaped rewards of those rounds (Trainer.set_reward_v6) are summed, and the transition is terminal when a round ended.
+A finished game is replaced by a new one within the same step.
+"""
+
+from copy import copy
+
+import numpy as np
+
+from phase_timers import phase_timers
+
+
+class VecEnv:
+    def __init__(self, trainer, main_qn, nb_envs):
+        self.trainer = trainer
+        self.nb_envs = nb_envs
+        self.players = [copy(main_qn) for _ in range(nb_envs)]
+        self.emulators = [trainer.new_emulator() for _ in range(nb_envs)]
+        for player, emulator in zip(self.players, self.emulators):
+            trainer.register_training_players(player, emulator)
+        self.game_states = [None] * nb_envs
+        self.messages = [[] for _ in range(nb_envs)]
+        self.valid_actions = [None] * nb_envs
+        self.nb_finished_rounds = [0] * nb_envs
+        self.nb_rounds = [0] * nb_envs
+        self.game_rewards = [0.0] * nb_envs
+
+    def reset(self):
+        """Starts a new game everywhere and returns the inputs of the first decision of every game."""
+        observations = self._new_observations()
+        for i in range(self.nb_envs):
+            self._new_game(i)
+            self._advance(i, observations[i])
+        return observations
+
+    def step(self, actions):
+        """
+        Plays action index actions[i] in game i and runs every game until its next decision. Returns the inputs of
+        those decisions, the rewards and terminal flags of the transitions, and the total rewards of the games that
+        finished during the step.
+        """
+        observations = self._new_observations()
+        rewards = np.zeros(self.nb_envs, dtype=np.float32)
+        dones = np.zeros(self.nb_envs, dtype=np.float32)
+        game_rewards = []
+        for i, action_idx in enumerate(actions):
+            _, action, amount = self.players[i].select_action(self.valid_actions[i], int(action_idx))
+            with phase_timers.time('emulator'):
+                self.game_states[i], self.messages[i] = self.emulators[i].apply_my_action(self.game_states[i], action,
+                                                                                          amount)
+            rewards[i], dones[i], finished = self._advance(i, observations[i])
+            game_rewards += finished
+        return observations, rewards, dones, game_rewards
+
+    def _new_observations(self):
+        return np.empty((self.nb_envs, self.players[0].featurizer.nb_features), dtype=np.float32)
+
+    def _new_game(self, i):
+        self.players[i].reset_game_state()
+        self.game_states[i] = self.trainer.new_training_game(self.emulators[i])
+        self.messages[i] = []
+        self.nb_finished_rounds[i] = 0
+        self.nb_rounds[i] = 0
+        self.game_rewards[i] = 0.0
+        self._start_round(i)
+
+    def _start_round(self, i):
+        with phase_timers.time('emulator'):
+            self.game_states[i], _ = self.emulators[i].start_new_round(self.game_states[i])
+        seats = self.game_states[i]['table'].seats.players
+        self.players[i].set_begin_round_stack(seats)
+        self.players[i].receive_round_start_message(None, None, seats)
+
+    def _advance(self, i, observation):
+        player, emulator = self.players[i], self.emulators[i]
+        reward, done, finished = 0.0, False, []
+        while True:
+            with phase_timers.time('emulator'):
+                params = emulator.run_until_my_next_action(self.game_states[i], player.uuid, self.messages[i])
+            if len(params) == 4:
+                self.game_states[i], self.valid_actions[i], hole_card, round_state = params
+                player.gather_informations(hole_card, round_state, self.valid_actions[i], out=observation)
+                return reward, done, finished
+
+            self.game_states[i], round_reward = params
+            self.messages[i] = []
+            self.nb_finished_rounds[i] += 1
+            last_round = emulator._is_last_round(self.game_states[i], emulator.game_rule)
+            self.nb_rounds[i], round_reward = self.trainer.set_reward_v6(round_reward, self.game_states[i], player,
+                                                                         self.nb_rounds[i],
+                                                                         self.nb_finished_rounds[i], last_round)
+            reward += round_reward
+            done = True
+            self.game_rewards[i] += round_reward
+            if last_round:
+                finished.append(self.game_rewards[i])
+                self._new_game(i)
+            else:
+                self._start_round(i)
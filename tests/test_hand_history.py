@@ -0,0 +1,91 @@
+"""
+Round trip of hand_history.py: the hands of scripted games on both engines are recorded with begin_hand and end_hand,
+then read back with read_hand_history, and must keep their actions, decisions and stacks, with winnings adding up to
+the pot.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from hand_history import HandRecorder, read_hand_history
+from lean_engine import LeanEmulator
+from my_emulator import MyEmulator
+from test_lean_engine import STACKS, play_scripted_game
+
+NB_GAMES = 5
+NB_INPUTS = 3
+CHUNK_SIZE = 7
+
+
+def record_games(recorder, emulator_class, nb_players, script, stacks):
+    """Records the hands of NB_GAMES scripted games, with a decision of the first seat in every other hand."""
+    hands = []
+    for seed in range(NB_GAMES):
+        game = recorder.new_game()
+        hand_stacks = random.Random(seed).sample(STACKS[stacks], nb_players)
+        for event in play_scripted_game(emulator_class(), seed, nb_players, script, stacks):
+            if event[0] != 'round':
+                continue
+            _, _, stacks_after, round_state = event
+            hand = recorder.begin_hand(game, hand_stacks, [None] * nb_players, NB_INPUTS, agent_seat=0)
+            if len(hands) % 2:
+                hand.add_decision(np.full(NB_INPUTS, len(hands)), 1)
+            recorder.end_hand(hand, round_state)
+            hands.append((game, hand_stacks, stacks_after, round_state))
+            hand_stacks = stacks_after
+    recorder.flush()
+    return hands
+
+
+@pytest.mark.parametrize('stacks', sorted(STACKS))
+@pytest.mark.parametrize('script', ['allin', 'mixed'])
+@pytest.mark.parametrize('emulator_class', [MyEmulator, LeanEmulator])
+def test_hand_history_round_trip(tmp_path, emulator_class, script, stacks):
+    recorder = HandRecorder(str(tmp_path), chunk_size=CHUNK_SIZE)
+    hands = record_games(recorder, emulator_class, 6, script, stacks)
+    chunks = list(read_hand_history(str(tmp_path)))
+    assert len(chunks) == recorder.nb_chunks > 1
+
+    i = 0
+    for chunk in chunks:
+        nb_hands = len(chunk['game'])
+        assert (chunk['run'] == recorder.run).all()
+        for name in ('action_offsets', 'decision_offsets'):
+            offsets = chunk[name]
+            assert len(offsets) == nb_hands + 1 and offsets[0] == 0 and (np.diff(offsets) >= 0).all()
+        assert chunk['action_offsets'][-1] == len(chunk['action_kind'])
+        assert chunk['decision_offsets'][-1] == len(chunk['decision_action'])
+        assert chunk['decision_inputs'].shape == (len(chunk['decision_action']), NB_INPUTS)
+        assert (chunk['winnings'] >= 0).all()
+        np.testing.assert_array_equal(chunk['winnings'].sum(axis=1), chunk['pot'])
+
+        for j in range(nb_hands):
+            game, stacks_before, stacks_after, round_state = hands[i]
+            assert chunk['game'][j] == game
+            assert chunk['round_count'][j] == round_state['round_count']
+            assert chunk['stacks_before'][j].tolist() == stacks_before
+            assert chunk['stacks_after'][j].tolist() == stacks_after
+            nb_actions = sum(len(actions) for actions in round_state['action_histories'].values())
+            assert np.diff(chunk['action_offsets'])[j] == nb_actions
+            start, end = chunk['decision_offsets'][j:j + 2]
+            assert end - start == i % 2
+            assert (chunk['decision_inputs'][start:end] == i).all()
+            i += 1
+    assert i == len(hands)
+
+
+def test_chunk_without_decisions(tmp_path):
+    recorder = HandRecorder(str(tmp_path))
+    hands = record_games(recorder, LeanEmulator, 2, 'mixed', 'deep')
+    hand = recorder.begin_hand(recorder.new_game(), hands[0][1], [None, None], NB_INPUTS)
+    recorder.end_hand(hand, hands[0][3])
+    recorder.flush()
+    chunk = list(read_hand_history(str(tmp_path)))[-1]
+    assert len(chunk['game']) == 1
+    assert chunk['decision_inputs'].shape == (0, NB_INPUTS)
+
+
+def test_runs_of_recorders_differ(tmp_path):
+    assert HandRecorder(str(tmp_path)).run != HandRecorder(str(tmp_path)).run
@@ -0,0 +1,140 @@
+"""
+Conformance of lean_engine.py to pypokerengine: the same seeded games of scripted players are played on MyEmulator and
+LeanEmulator, and every decision (valid actions, hole cards, round state), street change, round result, stack and
+final round state must be the same.
+"""
+
+import random
+
+import pytest
+from pypokerengine.players import BasePokerPlayer
+
+from lean_engine import LeanEmulator
+from my_emulator import MyEmulator
+
+NB_GAMES = 25
+MAX_ROUND = 10
+SMALL_BLIND_AMOUNT = 5
+
+# cumulative probabilities of the moves of a script
+SCRIPTS = {
+    # calls, folds, raises of every size, all-ins and illegal amounts
+    'mixed': [(0.1, 'fold'), (0.5, 'call'), (0.65, 'min_raise'), (0.72, 'allin'), (0.8, 'random_raise'),
+              (0.85, 'overcall'), (0.9, 'short_raise'), (0.95, 'overraise'), (1.0, 'wrong_call')],
+    # mostly all-ins, which build side pots between the different stacks
+    'allin': [(0.05, 'fold'), (0.4, 'call'), (0.9, 'allin'), (1.0, 'min_raise')],
+}
+
+STACKS = {
+    'deep': range(40, 400, 10),
+    # stacks close to the blinds and antes: players short of money are excluded and the blinds move
+    'short': range(5, 60, 5),
+}
+
+
+class ScriptedPlayer(BasePokerPlayer):
+    """Picks its moves from a script with its own seeded generator and records its decisions in a shared trace."""
+
+    def __init__(self, seed, script, trace):
+        self.rand = random.Random(seed)
+        self.script = script
+        self.trace = trace
+
+    def choose(self, valid_actions):
+        raise_amount = valid_actions[2]['amount']
+        choice = self.rand.random()
+        move = next(move for probability, move in self.script if choice < probability)
+        if move == 'fold':
+            return 'fold', 0
+        if move == 'call':
+            return 'call', valid_actions[1]['amount']
+        if move == 'min_raise':
+            return 'raise', raise_amount['min']
+        if move == 'allin':
+            return 'raise', raise_amount['max']
+        if move == 'random_raise':
+            return 'raise', self.rand.randint(min(raise_amount['min'], raise_amount['max']), raise_amount['max'])
+        if move == 'overcall':
+            return 'call', 10 ** 6
+        if move == 'short_raise':
+            return 'raise', raise_amount['min'] - 1
+        if move == 'overraise':
+            return 'raise', 10 ** 6
+        return 'call', valid_actions[1]['amount'] + 1
+
+    def declare_action(self, valid_actions, hole_card, round_state):
+        action, amount = self.choose(valid_actions)
+        self.trace.append(('ask', valid_actions, hole_card, round_state, action, amount))
+        return action, amount
+
+    def update_agressivity(self, round_state, old_street):
+        self.trace.append(('street', round_state, old_street))
+
+    def receive_game_start_message(self, game_info):
+        pass
+
+    def receive_round_start_message(self, round_count, hole_card, seats):
+        pass
+
+    def receive_street_start_message(self, street, round_state):
+        pass
+
+    def receive_game_update_message(self, action, round_state):
+        pass
+
+    def receive_round_result_message(self, winners, hand_info, round_state):
+        pass
+
+
+def play_scripted_game(emulator, seed, nb_players, script, stacks):
+    """Trace of a seeded game of scripted players on emulator."""
+    trace = []
+    players = [ScriptedPlayer(seed * 100 + i, SCRIPTS[script], trace) for i in range(nb_players)]
+    emulator.set_game_rule(player_num=nb_players, max_round=MAX_ROUND, small_blind_amount=SMALL_BLIND_AMOUNT,
+                           ante_amount=seed % 3)
+    emulator.record_rounds = True
+    for i, player in enumerate(players):
+        emulator.register_player(uuid=str(i + 1), player=player)
+    initial_stacks = random.Random(seed).sample(STACKS[stacks], nb_players)
+    random.seed(seed)
+    game_state = emulator.generate_initial_game_state({str(i + 1): {'name': 'p' + str(i + 1), 'stack': stack}
+                                                       for i, stack in enumerate(initial_stacks)})
+    game_state, events = emulator.start_new_round(game_state)
+    messages = []
+    # the game also ends when fewer than two players can pay the blinds
+    while not any(event['type'] == 'event_game_finish' for event in events):
+        params = emulator.run_until_my_next_action(game_state, '1', messages)
+        if len(params) == 4:
+            game_state, valid_actions, hole_card, round_state = params
+            action, amount = players[0].choose(valid_actions)
+            trace.append(('me', valid_actions, hole_card, round_state, action, amount))
+            game_state, messages = emulator.apply_my_action(game_state, action, amount)
+        else:
+            game_state, reward = params
+            trace.append(('round', reward, [player.stack for player in game_state['table'].seats.players],
+                          emulator.last_round_state))
+            if emulator._is_last_round(game_state, emulator.game_rule):
+                return trace
+            game_state, events = emulator.start_new_round(game_state)
+    trace.append(('finish', [player.stack for player in game_state['table'].seats.players]))
+    return trace
+
+
+def has_side_pots(trace):
+    return any(event[0] == 'round' and event[3]['pot']['side'] for event in trace)
+
+
+@pytest.mark.parametrize('stacks', sorted(STACKS))
+@pytest.mark.parametrize('script', sorted(SCRIPTS))
+@pytest.mark.parametrize('nb_players', [2, 3, 6, 9])
+def test_lean_engine_conforms_to_pypokerengine(nb_players, script, stacks):
+    side_pots = False
+    for seed in range(NB_GAMES):
+        expected = play_scripted_game(MyEmulator(), seed, nb_players, script, stacks)
+        actual = play_scripted_game(LeanEmulator(), seed, nb_players, script, stacks)
+        for i, (expected_event, actual_event) in enumerate(zip(expected, actual)):
+            assert expected_event == actual_event, 'game {0}, event {1}'.format(seed, i)
+        assert len(expected) == len(actual), 'game {0}'.format(seed)
+        side_pots = side_pots or has_side_pots(expected)
+    if script == 'allin' and nb_players > 2:
+        assert side_pots, 'no side pot was played'